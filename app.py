@@ -1,12 +1,13 @@
 import os
 import sys
+import select
 import subprocess
 import atexit
 from flask import Flask
 from flask_cors import CORS
-from backend.routes.products import products_bp
+from backend.routes.products import products_bp, warm_cache
 from backend.routes.sales import sales_bp
-from backend.routes.forecast import forecast_bp
+from backend.routes.forecast import forecast_bp, get_model, warm_training_data
 
 app = Flask(__name__)
 CORS(app)
@@ -42,6 +43,60 @@ def start_frontend():
     except Exception as e:
         print(f"Error starting frontend: {e}")
 
+def terminate_and_wait(process, timeout=5):
+    """
+    Terminate a child process and block until it exits, killing it when it
+    is still running after timeout seconds.
+
+    Waits on a pidfd (Linux) or kqueue NOTE_EXIT (macOS/BSD) so shutdown is a
+    single blocking syscall; falls back to Popen.wait where neither exists.
+    """
+    pidfd = None
+    kq = None
+    try:
+        if hasattr(os, 'pidfd_open'):
+            pidfd = os.pidfd_open(process.pid)
+        elif hasattr(select, 'kqueue'):
+            kq = select.kqueue()
+            kq.control([select.kevent(
+                process.pid,
+                filter=select.KQ_FILTER_PROC,
+                flags=select.KQ_EV_ADD | select.KQ_EV_ONESHOT,
+                fflags=select.KQ_NOTE_EXIT
+            )], 0, 0)
+    except OSError:
+        # Old kernel or process already gone
+        pidfd = None
+        if kq is not None:
+            kq.close()
+            kq = None
+
+    process.terminate()
+
+    try:
+        if pidfd is not None:
+            select.select([pidfd], [], [], timeout)
+        elif kq is not None:
+            kq.control(None, 1, timeout)
+        else:
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                pass
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+        if kq is not None:
+            kq.close()
+
+    # Reap the child so it does not linger as a zombie, escalating to a kill
+    # when it ignored the terminate
+    if process.poll() is None:
+        print(f"Process {process.pid} did not exit within {timeout}s, killing it")
+        process.kill()
+        process.wait()
+
+
 def cleanup():
     """Cleanup function to stop frontend server on exit"""
     global frontend_process
@@ -52,14 +107,39 @@ def cleanup():
                 subprocess.call(['taskkill', '/F', '/T', '/PID', str(frontend_process.pid)], 
                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             else:
-                frontend_process.terminate()
-                frontend_process.wait(timeout=5)
+                terminate_and_wait(frontend_process, timeout=5)
         except Exception as e:
             print(f"Error stopping frontend: {e}")
 
 # Register cleanup function
 atexit.register(cleanup)
 
+def run_production_server():
+    """Serve the app with waitress so requests are handled concurrently"""
+    from waitress import serve
+
+    threads = int(os.environ.get('WAITRESS_THREADS', 8))
+
+    # Load the forecasting model, its training data and the filter lists
+    # once before accepting requests; every worker thread then shares them
+    # instead of racing to load them inside the first requests. Up to
+    # `threads` predictions run at once, so each gets its share of the cores
+    # (PREDICT_THREADS overrides it) rather than all of them
+    predict_threads = int(os.environ.get('PREDICT_THREADS',
+                                         max(1, (os.cpu_count() or 1) // threads)))
+    get_model(nthread=predict_threads)
+    warm_training_data()
+    warm_cache()
+
+    serve(
+        app,
+        # Loopback by default, like the dev server; set HOST (e.g. 0.0.0.0)
+        # to serve on other interfaces
+        host=os.environ.get('HOST', '127.0.0.1'),
+        port=int(os.environ.get('PORT', 5000)),
+        threads=threads
+    )
+
 if __name__ == '__main__':
     # Only start frontend in main process (not reloader)
     if os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
@@ -68,7 +148,11 @@ if __name__ == '__main__':
     # Start backend server
     print("Starting backend server...")
     try:
-        app.run(debug=True, port=5000, use_reloader=True)
+        if os.environ.get('FLASK_DEV'):
+            # Single-threaded Werkzeug dev server with debugger and reloader
+            app.run(debug=True, port=5000, use_reloader=True)
+        else:
+            run_production_server()
     except KeyboardInterrupt:
         print("\nShutting down servers...")
         cleanup()
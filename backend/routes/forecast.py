@@ -1,15 +1,17 @@
 from flask import Blueprint, request, jsonify
 import sys
 import os
-import pandas as pd
-import numpy as np
+import threading
 from datetime import datetime
 
 # Add model directory to path
 model_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'model')
 sys.path.insert(0, model_path)
 
-from demand_forecasting_model import DemandForecastingModel
+# numpy and the model module are imported inside the functions that use
+# them; pandas is already loaded by backend.utils.database
+from backend.utils.database import DB_PATH, get_product_skus
+from backend.utils.responses import json_response
 
 forecast_bp = Blueprint("forecast", __name__, url_prefix="/api/forecast")
 
@@ -17,14 +19,27 @@ forecast_bp = Blueprint("forecast", __name__, url_prefix="/api/forecast")
 _model = None
 _model_loaded = False
 
-def get_model():
-    """Load model once and cache it."""
+# Training data the forecasts are computed from
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+                         'data', 'xg_df.csv')
+
+# Parsed training data, keyed by (csv path, csv mtime); the lock makes
+# concurrent first requests parse the CSV once instead of racing on it
+_DF_CACHE = {}
+_DF_LOCK = threading.Lock()
+
+def get_model(nthread=None):
+    """
+    Load model once and cache it. nthread caps the threads each prediction
+    uses (default: every core); it only applies to the first, loading call.
+    """
     global _model, _model_loaded
     if not _model_loaded:
         try:
+            from demand_forecasting_model import DemandForecastingModel
             _model = DemandForecastingModel()
             model_dir = os.path.join(model_path, 'saved_models')
-            _model.load_model(model_dir)
+            _model.load_model(model_dir, nthread=nthread)
             _model_loaded = True
             print("Forecasting model loaded successfully")
         except Exception as e:
@@ -33,6 +48,90 @@ def get_model():
     return _model
 
 
+def _load_xg_df(data_path):
+    """
+    Load the training data once per CSV modification time.
+
+    The parsed frame is written to a Parquet file next to the CSV so later
+    process starts skip CSV parsing and date conversion.
+
+    Returns:
+        Tuple of (dataframe, dict mapping sku_id to its row positions)
+    """
+    csv_mtime = os.path.getmtime(data_path)
+    cache_key = (data_path, csv_mtime)
+    cached = _DF_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    with _DF_LOCK:
+        cached = _DF_CACHE.get(cache_key)
+        if cached is None:
+            cached = _parse_xg_df(data_path, csv_mtime)
+            _DF_CACHE.clear()
+            _DF_CACHE[cache_key] = cached
+    return cached
+
+
+def _parse_xg_df(data_path, csv_mtime):
+    """Parse the training data (Parquet sidecar first) and index it by SKU."""
+    import pandas as pd
+
+    parquet_path = os.path.splitext(data_path)[0] + '.parquet'
+    df = None
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= csv_mtime:
+        try:
+            df = pd.read_parquet(parquet_path)
+            if not df['Date'].is_monotonic_increasing:
+                df = df.sort_values('Date', kind='stable', ignore_index=True)
+        except (ImportError, OSError, ValueError) as e:
+            print(f"Could not read {parquet_path}, falling back to CSV: {e}")
+
+    if df is None:
+        df = pd.read_csv(data_path)
+
+        # Drop unnamed column if exists
+        if 'Unnamed: 0' in df.columns:
+            df = df.drop(columns=['Unnamed: 0'])
+
+        df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d', cache=True)
+
+        # Date-ordered rows keep every per-SKU selection sorted, so the
+        # horizon cutoff becomes a binary search instead of a mask
+        df = df.sort_values('Date', kind='stable', ignore_index=True)
+
+        # Written to a temporary file and renamed into place, so another
+        # process never reads a half-written Parquet file
+        tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+        try:
+            df.to_parquet(tmp_path, compression='zstd', index=False)
+            os.replace(tmp_path, parquet_path)
+        except (ImportError, OSError, ValueError) as e:
+            print(f"Could not write Parquet cache {parquet_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    # Row positions per SKU so requests only touch the rows they select
+    sku_index = df.groupby('sku_id', sort=False).indices
+    return df, sku_index
+
+
+def warm_training_data():
+    """Parse the training data ahead of the first forecast request."""
+    if os.path.exists(DATA_PATH):
+        _load_xg_df(DATA_PATH)
+
+
+def _select_skus(df, sku_index, sku_list):
+    """Return the rows for the given SKUs, in date order."""
+    import numpy as np
+
+    positions = [sku_index[sku_id] for sku_id in sku_list if sku_id in sku_index]
+    if not positions:
+        return df.iloc[0:0]
+    return df.take(np.sort(np.concatenate(positions)))
+
+
 @forecast_bp.route("/predict", methods=['POST'])
 def predict_demand():
     """
@@ -48,6 +147,9 @@ def predict_demand():
     Returns:
         JSON object with forecast results
     """
+    import pandas as pd
+    import numpy as np
+
     try:
         data = request.get_json()
         category = data.get('category')
@@ -67,34 +169,12 @@ def predict_demand():
             return jsonify({'error': 'Forecasting model not available'}), 500
         
         # Get SKU(s) from database based on category and product selection
-        import sqlite3
-        db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
-                               'database', 'database.db')
-        
-        if not os.path.exists(db_path):
+        if not os.path.exists(DB_PATH):
             return jsonify({'error': 'Database not found'}), 500
         
-        conn = sqlite3.connect(db_path)
-        
-        # Get SKUs and product info from database
-        if product_name:
-            # Specific product selected
-            query = """
-                SELECT sku_id, product_name, category 
-                FROM products 
-                WHERE product_name = ? AND category = ?
-            """
-            product_info_df = pd.read_sql_query(query, conn, params=(product_name, category))
-        else:
-            # All products in category
-            query = """
-                SELECT sku_id, product_name, category 
-                FROM products 
-                WHERE category = ?
-            """
-            product_info_df = pd.read_sql_query(query, conn, params=(category,))
-        
-        conn.close()
+        # Get SKUs and product info through the shared cached connection, so
+        # the lookup reuses an already prepared statement
+        product_info_df = get_product_skus(category, product_name)
         
         if len(product_info_df) == 0:
             return jsonify({'error': 'No products found in database for selected category/product'}), 404
@@ -102,34 +182,28 @@ def predict_demand():
         # Get list of SKUs to filter training data
         sku_list = product_info_df['sku_id'].tolist()
         
-        # Create SKU to product name mapping for display
-        sku_to_product = dict(zip(product_info_df['sku_id'], product_info_df['product_name']))
+        # SKU to product name lookup for display
+        sku_to_product = (
+            product_info_df.drop_duplicates('sku_id').set_index('sku_id')['product_name']
+        )
         
         # Load the training data
-        data_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
-                                 'data', 'xg_df.csv')
-        
-        if not os.path.exists(data_path):
+        if not os.path.exists(DATA_PATH):
             return jsonify({'error': 'Training data not found'}), 500
         
-        df = pd.read_csv(data_path)
-        
-        # Drop unnamed column if exists
-        if 'Unnamed: 0' in df.columns:
-            df = df.drop(columns=['Unnamed: 0'])
-        
-        df['Date'] = pd.to_datetime(df['Date'])
+        df, sku_index = _load_xg_df(DATA_PATH)
         
         # Filter training data by SKUs from database
-        filtered_df = df[df['sku_id'].isin(sku_list)].copy()
+        filtered_df = _select_skus(df, sku_index, sku_list)
         
         if len(filtered_df) == 0:
             return jsonify({'error': 'No training data found for selected product(s). The product may not have historical data.'}), 404
         
         # Get the most recent data for the horizon
-        max_date = filtered_df['Date'].max()
+        filtered_dates = filtered_df['Date']
+        max_date = filtered_dates.iloc[-1]
         forecast_start = max_date - pd.Timedelta(days=horizon - 1)
-        forecast_df = filtered_df[filtered_df['Date'] >= forecast_start].copy()
+        forecast_df = filtered_df.iloc[filtered_dates.searchsorted(forecast_start):]
         
         if len(forecast_df) == 0:
             return jsonify({'error': f'Insufficient data for {horizon}-day forecast'}), 400
@@ -138,37 +212,48 @@ def predict_demand():
         predictions = model.predict(forecast_df)
         
         # Prepare response using product names from database
-        results = []
-        for idx, (_, row) in enumerate(forecast_df.iterrows()):
-            sku_id = row['sku_id']
-            # Get actual product name from database mapping
-            display_product_name = sku_to_product.get(sku_id, f"Unknown SKU: {sku_id}")
-            
-            results.append({
-                'date': row['Date'].strftime('%Y-%m-%d'),
-                'sku_id': sku_id,
-                'product_name': display_product_name,
+        # Extract whole columns once instead of boxing every cell via iterrows
+        dates = forecast_df['Date'].dt.strftime('%Y-%m-%d').tolist()
+        sku_col = forecast_df['sku_id']
+        skus = sku_col.tolist()
+        # One hash join in pandas instead of a dict lookup per row
+        names = sku_col.map(sku_to_product)
+        names = names.where(names.notna(), 'Unknown SKU: ' + sku_col.astype(str)).tolist()
+        has_actuals = 'quantity' in forecast_df.columns
+        if has_actuals:
+            actual_arr = forecast_df['quantity'].to_numpy(dtype=float)
+            actuals = actual_arr.tolist()
+        else:
+            actuals = [None] * len(forecast_df)
+        predicted_arr = np.asarray(predictions, dtype=float)
+        predicted = predicted_arr.tolist()
+
+        results = [
+            {
+                'date': d,
+                'sku_id': s,
+                'product_name': n,
                 'category': category,
-                'actual_quantity': float(row['quantity']) if 'quantity' in row else None,
-                'predicted_quantity': float(predictions[idx]),
+                'actual_quantity': q,
+                'predicted_quantity': p,
                 'forecast_horizon': horizon
-            })
+            }
+            for d, s, n, q, p in zip(dates, skus, names, actuals, predicted)
+        ]
         
-        # Calculate summary metrics
-        if 'quantity' in forecast_df.columns:
-            total_actual = float(np.sum(forecast_df['quantity'].values))
-            total_predicted = float(np.sum(predictions))
-            
+        # Calculate summary metrics from the arrays extracted above
+        total_predicted = float(predicted_arr.sum())
+        if has_actuals:
             summary = {
-                'total_actual': total_actual,
+                'total_actual': float(actual_arr.sum()),
                 'total_predicted': total_predicted
             }
         else:
             summary = {
-                'total_predicted': float(np.sum(predictions))
+                'total_predicted': total_predicted
             }
         
-        return jsonify({
+        return json_response({
             'success': True,
             'forecast': results,
             'summary': summary,
@@ -191,7 +276,7 @@ def model_status():
     """Check if the forecasting model is loaded and available."""
     model = get_model()
     if model is not None:
-        return jsonify({
+        return json_response({
             'status': 'available',
             'model_type': 'XGBoost',
             'supported_horizons': [7, 14, 30],
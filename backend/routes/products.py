@@ -1,30 +1,80 @@
-from flask import Blueprint, request, jsonify
+from functools import lru_cache
+from flask import Blueprint
 from backend.utils.database import (
+    db_version,
     get_categories,
     get_products,
     get_products_by_category
 )
+from backend.utils.responses import dumps_json, bytes_response
 
 products_bp = Blueprint("products", __name__, url_prefix="/api/products")
 
+# Lets browsers reuse filter responses without a round trip
+CLIENT_MAX_AGE_SECONDS = 60
+
+
+# Filter lists change only when the database is rebuilt, so every response
+# body is cached per db_version() and re-queried only after a rebuild.
+# Zero-argument endpoints: one precomputed body per database version. The
+# lookups run with strict=True, so a database error propagates out of the
+# cached function and is never stored as an empty list.
+@lru_cache(maxsize=1)
+def _cached_categories_json(version):
+    return dumps_json(get_categories(strict=True))
+
+
+@lru_cache(maxsize=1)
+def _cached_products_json(version):
+    return dumps_json(get_products(strict=True))
+
+
+@lru_cache(maxsize=256)
+def _cached_products_by_category_json(category, version):
+    return dumps_json(get_products_by_category(category=category, strict=True))
+
+
+def _filter_response(cached_body, *args):
+    """
+    Cached filter list body, or an uncached empty list (without client
+    caching) when the database query failed
+    """
+    try:
+        body = cached_body(*args, db_version())
+    except Exception as e:
+        print(f"Database error {e}")
+        return bytes_response(dumps_json([]))
+    return bytes_response(body, max_age=CLIENT_MAX_AGE_SECONDS)
+
+
+def warm_cache():
+    """
+    Materialize the zero-argument response bodies ahead of the first request.
+    Called by run_production_server, not at import, so importing the
+    blueprint never touches the database.
+    """
+    version = db_version()
+    try:
+        _cached_categories_json(version)
+        _cached_products_json(version)
+    except Exception as e:
+        print(f"Could not warm filter cache: {e}")
+
 
 # GET endpoints for filters
 @products_bp.route("/categories", methods=["GET"])
 def api_get_categories():
     """Get all unique categories"""
-    df = get_categories()
-    return jsonify(df.to_dict(orient="records"))
+    return _filter_response(_cached_categories_json)
 
 
 @products_bp.route("/products", methods=["GET"])
 def api_get_products():
     """Get all products"""
-    df = get_products()
-    return jsonify(df.to_dict(orient="records"))
+    return _filter_response(_cached_products_json)
 
 
 @products_bp.route("/products/<category>", methods=["GET"])
 def api_get_products_by_category(category):
     """Get products filtered by category"""
-    df = get_products_by_category(category=category)
-    return jsonify(df.to_dict(orient="records"))
+    return _filter_response(_cached_products_by_category_json, category)
@@ -1,9 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 from backend.utils.database import (
     get_year_range,
     get_the_total_product_sales_based_on_category,
     get_sales_pattern_by_date
 )
+from backend.utils.responses import json_response, df_response
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,8 +23,7 @@ def api_get_year_range():
             "max_year": int - Latest year in database
         }
     """
-    df = get_year_range()
-    return jsonify(df.to_dict(orient='records')[0])
+    return json_response(get_year_range())
 
 
 @sales_bp.route("/product-sales", methods=['POST'])
@@ -59,7 +59,7 @@ def api_get_product_sales():
         start_date=start_date,
         end_date=end_date
     )
-    return jsonify(df.to_dict(orient='records'))
+    return df_response(df)
 
 
 @sales_bp.route("/sales-pattern", methods=['POST'])
@@ -95,5 +95,5 @@ def api_get_sales_pattern():
         
     )
     
-    return jsonify(df.to_dict(orient='records'))
+    return df_response(df)
  
\ No newline at end of file
@@ -1,93 +1,456 @@
+import os
 import sqlite3
+import threading
+import atexit
+from functools import lru_cache
 import pandas as pd
 from typing import Optional
+try:
+    # Optional: ADBC decodes SQLite results straight into Arrow buffers
+    import adbc_driver_sqlite.dbapi as adbc_sqlite
+except ImportError:
+    adbc_sqlite = None
 from datetime import date, timedelta
 import calendar
+from pathlib import Path
 
-DB_PATH = "database/database.db"
+# Resolved from this file, not the working directory, so starting the server
+# elsewhere never creates an empty database.db there
+DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'database', 'database.db'
+)
 
-def query_db(sql, params=()):
+# Opened read-only: a missing file is an error instead of a new empty database
+DB_URI = Path(DB_PATH).as_uri() + '?mode=ro'
+
+# Larger per-connection statement cache; SQL below is kept in module-level
+# constants so every call reuses the same compiled statement
+CACHED_STATEMENTS = 512
+
+# One read-only connection per thread, opened lazily and reused across requests
+_TLS = threading.local()
+_CONNECTIONS = []
+_CONNECTIONS_LOCK = threading.Lock()
+
+# Read-side settings only; the connections are opened with mode=ro, so
+# journal mode and sync settings are left to setup_database.py
+CONNECTION_PRAGMAS = (
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA query_only=1",
+)
+
+
+def _db_file_identity():
     """
-    Execute a SELECT query and return pandas DataFrame
+    (inode, mtime in ns) of the database file, or None when it does not exist.
+    setup_database.py replaces the file on a rebuild, which changes both.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        df = pd.read_sql_query(sql=sql, con=conn, params=params)
+        st = os.stat(DB_PATH)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns)
+
+
+def _forget_connection(conn):
+    """Close a cached connection and drop it from the atexit list"""
+    with _CONNECTIONS_LOCK:
+        if conn in _CONNECTIONS:
+            _CONNECTIONS.remove(conn)
+    try:
         conn.close()
-        return df
+    except Exception:
+        pass
+
+
+def get_connection():
+    """
+    Return the calling thread's cached SQLite connection, creating it on first use.
+    The connection is reopened when the database file has been replaced or
+    modified since it was opened, so a rebuilt database is never read
+    through a handle to the old file.
+    """
+    identity = _db_file_identity()
+    conn = getattr(_TLS, 'conn', None)
+    if conn is not None and _TLS.conn_identity != identity:
+        _forget_connection(conn)
+        conn = _TLS.conn = None
+    if conn is None:
+        conn = sqlite3.connect(DB_URI, uri=True, check_same_thread=False,
+                               isolation_level=None, cached_statements=CACHED_STATEMENTS)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        _TLS.conn = conn
+        _TLS.conn_identity = identity
+        with _CONNECTIONS_LOCK:
+            _CONNECTIONS.append(conn)
+    return conn
+
+
+def get_adbc_connection():
+    """
+    Return the calling thread's cached ADBC SQLite connection, creating it on
+    first use and reopening it when the database file changes
+    """
+    identity = _db_file_identity()
+    conn = getattr(_TLS, 'adbc_conn', None)
+    if conn is not None and _TLS.adbc_conn_identity != identity:
+        _forget_connection(conn)
+        conn = _TLS.adbc_conn = None
+    if conn is None:
+        conn = adbc_sqlite.connect(DB_URI)
+        _TLS.adbc_conn = conn
+        _TLS.adbc_conn_identity = identity
+        with _CONNECTIONS_LOCK:
+            _CONNECTIONS.append(conn)
+    return conn
+
+
+def close_connections():
+    """Close every cached thread connection (registered with atexit)"""
+    with _CONNECTIONS_LOCK:
+        while _CONNECTIONS:
+            try:
+                _CONNECTIONS.pop().close()
+            except Exception:
+                pass
+
+
+atexit.register(close_connections)
+
+
+# The helpers below are backed by the covering indexes that
+# database/setup_database.py builds (INDEX_STATEMENTS there): the sales
+# helpers range seek sales_fact by (category, product_name, date_key) and read
+# the summed columns from the index without touching the table. Dates are
+# compared as integer YYYYMMDD date_key values.
+
+
+def explain_query_plan(sql, params=()):
+    """
+    Return the EXPLAIN QUERY PLAN detail lines for a query.
+    Useful during development to confirm a helper SEARCHes an index instead of SCANning.
+    """
+    cursor = get_connection().execute("EXPLAIN QUERY PLAN " + sql, params)
+    return [row[-1] for row in cursor]
+
+
+def downcast_integers(df):
+    """
+    Narrow int64 columns to the smallest integer dtype holding their values.
+    Lossless; float columns are left as float64 so revenue values keep
+    their exact JSON representation.
+    """
+    for column in df.select_dtypes('int64').columns:
+        df[column] = pd.to_numeric(df[column], downcast='integer')
+    return df
+
+
+def downcast_arrow_integers(table):
+    """Cast int64 columns of a pyarrow.Table to int32 when every value fits"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    int32 = pa.int32()
+    for i, field in enumerate(table.schema):
+        if not pa.types.is_int64(field.type) or table.num_rows == 0:
+            continue
+        bounds = pc.min_max(table.column(i))
+        low, high = bounds['min'].as_py(), bounds['max'].as_py()
+        if low is None or (-2**31 <= low and high < 2**31):
+            table = table.set_column(i, field.with_type(int32),
+                                     pc.cast(table.column(i), int32))
+    return table
+
+
+def query_db(sql, params=(), dtype_downcast=True):
+    """
+    Execute a SELECT query and return pandas DataFrame.
+    Integer columns are narrowed with downcast_integers unless dtype_downcast is False.
+    """
+    try:
+        cursor = get_connection().execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        df = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+        return downcast_integers(df) if dtype_downcast else df
     except Exception as e:
         print(f"Database error {e}")
         return pd.DataFrame()
 
-def get_categories():
-    """Get all unique categories from products table"""
-    sql = "SELECT DISTINCT category FROM products WHERE category IS NOT NULL ORDER BY category"
-    df = query_db(sql)
-    # Rename column to match expected format
-    df.rename(columns={'category': 'category_name'}, inplace=True)
-    return df
+def _fetch_arrow(sql, params=()):
+    """Result of a SELECT query as a pyarrow.Table (see query_arrow); errors propagate"""
+    import pyarrow as pa
 
+    if adbc_sqlite is not None:
+        cursor = get_adbc_connection().cursor()
+        try:
+            cursor.execute(sql, params or None)
+            return downcast_arrow_integers(cursor.fetch_arrow_table())
+        finally:
+            cursor.close()
 
-def get_products():
-    """Get all products from products table"""
-    sql = "SELECT DISTINCT product_name FROM products ORDER BY product_name"
-    return query_db(sql)
+    cursor = get_connection().execute(sql, params)
+    names = [column[0] for column in cursor.description]
+    rows = cursor.fetchall()
+    columns = list(zip(*rows)) if rows else [() for _ in names]
+    table = pa.table({name: pa.array(values) for name, values in zip(names, columns)})
+    return downcast_arrow_integers(table)
 
 
-def get_products_by_category(category):
-    """Get the products based on category"""
-    sql = "SELECT DISTINCT product_name FROM products WHERE category = ? ORDER BY product_name"
-    return query_db(sql, (category,))
+def query_arrow(sql, params=()):
+    """
+    Execute a SELECT query and return a pyarrow.Table, with int64 columns
+    narrowed to int32 where the values fit. Conversion to pandas is left to the consumer, if it needs it at all.
+    """
+    import pyarrow as pa
+
+    try:
+        return _fetch_arrow(sql, params)
+    except Exception as e:
+        print(f"Database error {e}")
+        return pa.table({})
 
+def _fetch_list(sql, params=()):
+    """Values of a single-column SELECT query as a list; errors propagate"""
+    cursor = get_connection().execute(sql, params)
+    return [row[0] for row in cursor]
 
-def get_year_range():
-    """Get min and max years from sales table"""
-    sql = """
+
+def _fetch_row(sql, params=()):
+    """First row of a SELECT query as a dict, or {} without rows; errors propagate"""
+    cursor = get_connection().execute(sql, params)
+    row = cursor.fetchone()
+    if row is None:
+        return {}
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def query_list(sql, params=()):
+    """
+    Execute a single-column SELECT query and return its values as a list.
+    Skips pandas entirely for small DISTINCT lookups.
+    """
+    try:
+        return _fetch_list(sql, params)
+    except Exception as e:
+        print(f"Database error {e}")
+        return []
+
+def query_row(sql, params=()):
+    """
+    Execute a single-row SELECT query and return it as a dict keyed by column name.
+    Returns an empty dict when there is no row or on error.
+    """
+    try:
+        return _fetch_row(sql, params)
+    except Exception as e:
+        print(f"Database error {e}")
+        return {}
+
+# dim_category / dim_product are small distinct-value tables built by
+# setup_database.py; dim_category's primary key and dim_product's
+# (category, product_name) unique index return rows already in order
+SQL_CATEGORIES = "SELECT category_name FROM dim_category ORDER BY category_name"
+
+SQL_PRODUCTS = "SELECT DISTINCT product_name FROM dim_product ORDER BY product_name"
+
+SQL_PRODUCTS_BY_CATEGORY = "SELECT product_name FROM dim_product WHERE category = ? ORDER BY product_name"
+
+# Each subquery reads one endpoint of idx_sales_date_key
+SQL_YEAR_RANGE = """
         SELECT 
-            CAST(strftime('%Y', MIN(date)) AS INTEGER) AS min_year,
-            CAST(strftime('%Y', MAX(date)) AS INTEGER) AS max_year
-        FROM sales
+            (SELECT MIN(date_key) FROM sales) / 10000 AS min_year,
+            (SELECT MAX(date_key) FROM sales) / 10000 AS max_year
     """
-    return query_db(sql)
 
+# products rows the forecast route scores, for one product or a whole category
+SQL_PRODUCT_SKUS = """
+        SELECT sku_id, product_name, category 
+        FROM products 
+        WHERE product_name = ? AND category = ?
+    """
 
-def get_the_total_product_sales_based_on_category(category, product, start_date, end_date):
-    """return the total quantity sold, total revenue and price of that product"""
-    query = """
+SQL_CATEGORY_SKUS = """
+        SELECT sku_id, product_name, category 
+        FROM products 
+        WHERE category = ?
+    """
+
+# sales_fact is sales pre-joined with products (built by setup_database.py),
+# so the sales helpers are single-table range scans. product_name, category
+# and default_price are functionally dependent on sku_id, so grouping on
+# sku_id alone keeps the aggregation key to one column.
+SQL_PRODUCT_SALES = """
         SELECT 
-            p.product_name,
-            p.category AS category_name,
-            SUM(s.quantity) AS total_quantity_sold,
-            p.default_price AS price,
-            SUM(s.net_revenue) AS total_revenue
-        FROM sales s
-        INNER JOIN products p ON s.sku_id = p.sku_id
-        WHERE p.category = ? 
-            AND p.product_name = ?
-            AND s.date >= ?
-            AND s.date <= ?
-        GROUP BY p.sku_id, p.product_name, p.category, p.default_price
-    """
-    return query_db(query, (category, product, start_date, end_date))
+            product_name,
+            category AS category_name,
+            SUM(quantity) AS total_quantity_sold,
+            default_price AS price,
+            SUM(net_revenue) AS total_revenue
+        FROM sales_fact
+        WHERE category = ? 
+            AND product_name = ?
+            AND date_key >= ?
+            AND date_key <= ?
+        GROUP BY sku_id
+    """
+
+# daily_sales is sales_fact pre-aggregated per (category, product_name, day),
+# so the chart query reads one index entry per day
+SQL_SALES_PATTERN = """
+        SELECT
+            sale_date,
+            SUM(total_sales) AS total_sales,
+            SUM(total_quantity) AS total_quantity
+        FROM daily_sales
+        WHERE category = ?
+            AND product_name = ?
+            AND date_key >= ?
+            AND date_key <= ?
+        GROUP BY date_key
+        ORDER BY date_key
+    """
+
+
+def date_key(value):
+    """
+    Convert a YYYY-MM-DD date (string, or date/datetime object) to its
+    integer YYYYMMDD key. Strings are parsed with date.fromisoformat, so
+    a non-zero-padded value such as '2023-1-5' is rejected instead of
+    becoming a wrong key. Returns None for missing or malformed values,
+    which matches no rows.
+    """
+    if value is None:
+        return None
+    if not isinstance(value, date):
+        try:
+            # The first 10 characters also accept 'YYYY-MM-DD HH:MM:SS'
+            value = date.fromisoformat(str(value)[:10])
+        except ValueError:
+            return None
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def db_version():
+    """
+    Database file (inode, mtime_ns), the same identity get_connection()
+    reopens on; changes whenever setup_database.py rebuilds the file
+    """
+    return _db_file_identity()
+
+
+# Metadata results only change when the CSVs are re-imported. They are cached
+# as immutable tuples keyed by db_version(), and each getter builds a fresh
+# list/dict from them so callers may mutate what they receive. The cached
+# functions let errors propagate, so lru_cache only ever stores successful
+# results; a transient failure (e.g. "database is locked" during a rebuild)
+# is reported by the getter and retried on the next call.
+@lru_cache(maxsize=128)
+def _cached_column(sql, params, version):
+    return tuple(_fetch_list(sql, params))
+
+
+@lru_cache(maxsize=8)
+def _cached_row(sql, params, version):
+    return tuple(_fetch_row(sql, params).items())
+
+
+def _column(sql, params=(), strict=False):
+    """
+    Cached column values for the current database version; () on error,
+    or the error itself when strict
+    """
+    try:
+        return _cached_column(sql, params, db_version())
+    except Exception as e:
+        if strict:
+            raise
+        print(f"Database error {e}")
+        return ()
+
+
+def _row(sql, params=()):
+    """Cached row items for the current database version, () on error"""
+    try:
+        return _cached_row(sql, params, db_version())
+    except Exception as e:
+        print(f"Database error {e}")
+        return ()
+
+
+# Chart series are re-requested for the same product and date range as users
+# switch between selections; pyarrow tables are immutable, so one cached
+# table is safely shared by every response. Like the metadata caches, only
+# successful results are cached: errors propagate to the getter
+@lru_cache(maxsize=256)
+def _cached_sales_pattern(category, product, start_key, end_key, version):
+    return _fetch_arrow(SQL_SALES_PATTERN, (category, product, start_key, end_key))
+
+
+def invalidate_metadata_cache():
+    """Drop cached metadata results, e.g. after reloading the database in-process"""
+    _cached_column.cache_clear()
+    _cached_row.cache_clear()
+    _cached_sales_pattern.cache_clear()
+
+
+# The filter getters return [] on a database error; with strict=True the
+# error propagates instead, for callers that cache what they receive
+
+
+def get_categories(strict=False):
+    """Get all unique categories from products table as records"""
+    categories = _column(SQL_CATEGORIES, strict=strict)
+    return [{'category_name': category} for category in categories]
+
+
+def get_products(strict=False):
+    """Get all products from products table as records"""
+    names = _column(SQL_PRODUCTS, strict=strict)
+    return [{'product_name': name} for name in names]
+
+
+def get_products_by_category(category, strict=False):
+    """Get the products based on category as records"""
+    names = _column(SQL_PRODUCTS_BY_CATEGORY, (category,), strict=strict)
+    return [{'product_name': name} for name in names]
+
+
+def get_year_range():
+    """Get min and max years from sales table as a {'min_year', 'max_year'} dict"""
+    return dict(_row(SQL_YEAR_RANGE))
+
+
+def get_the_total_product_sales_based_on_category(category, product, start_date, end_date):
+    """return the total quantity sold, total revenue and price of that product as a pyarrow.Table"""
+    return query_arrow(SQL_PRODUCT_SALES,
+                       (category, product, date_key(start_date), date_key(end_date)))
 
 
 def get_sales_pattern_by_date(category, product, start_date, end_date):
     """
     Get daily sales pattern for a specific product within a date range.
-    Returns sales aggregated by date for time series visualization.
+    Returns sales aggregated by date for time series visualization, as a pyarrow.Table.
     """
-    query = """
-        SELECT
-            s.date AS sale_date,
-            SUM(s.net_revenue) AS total_sales,
-            SUM(s.quantity) AS total_quantity
-        FROM sales s
-        INNER JOIN products p ON s.sku_id = p.sku_id
-        WHERE p.category = ?
-            AND p.product_name = ?
-            AND s.date >= ?
-            AND s.date <= ?
-        GROUP BY s.date
-        ORDER BY s.date
-    """
-    return query_db(query, (category, product, start_date, end_date))
\ No newline at end of file
+    import pyarrow as pa
+
+    try:
+        return _cached_sales_pattern(category, product, date_key(start_date),
+                                     date_key(end_date), db_version())
+    except Exception as e:
+        print(f"Database error {e}")
+        return pa.table({})
+
+
+
+def get_product_skus(category, product=None):
+    """
+    Get the SKUs (sku_id, product_name, category) of a product, or of every
+    product in the category when no product is given, as a DataFrame
+    """
+    if product:
+        return query_db(SQL_PRODUCT_SKUS, (product, category))
+    return query_db(SQL_CATEGORY_SKUS, (category,))
@@ -0,0 +1,61 @@
+import io
+import orjson
+from flask import Response, request
+
+# numpy arrays/scalars are encoded natively instead of being boxed to Python objects
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+
+def dumps_json(payload):
+    """Serialize a payload to JSON bytes with orjson"""
+    return orjson.dumps(payload, option=ORJSON_OPTIONS)
+
+
+def bytes_response(body, status=200, max_age=None):
+    """
+    Wrap pre-serialized JSON bytes in a Response that Werkzeug hands to the
+    socket as-is, with Content-Length known up front
+    """
+    headers = {'Content-Length': str(len(body))}
+    if max_age is not None:
+        headers['Cache-Control'] = f'public, max-age={max_age}'
+    return Response(body, status=status, mimetype="application/json",
+                    headers=headers, direct_passthrough=True)
+
+
+def json_response(payload, status=200, max_age=None):
+    """Wrap a payload in a JSON Response, bypassing jsonify"""
+    return bytes_response(dumps_json(payload), status=status, max_age=max_age)
+
+
+def arrow_response(df):
+    """
+    Return a DataFrame or pyarrow.Table as an Arrow IPC stream, without
+    building Python records
+    """
+    import pyarrow as pa
+
+    table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+    buf = io.BytesIO()
+    with pa.ipc.new_stream(buf, table.schema) as writer:
+        writer.write_table(table)
+    body = buf.getvalue()
+    return Response(body, mimetype=ARROW_STREAM_MIMETYPE,
+                    headers={'Content-Length': str(len(body))}, direct_passthrough=True)
+
+
+def df_response(df):
+    """
+    Return a DataFrame or pyarrow.Table as a JSON list of records, or as an
+    Arrow IPC stream when the client prefers it via the Accept header
+    """
+    accepted = request.accept_mimetypes
+    # Arrow only when asked for explicitly; */* (browsers, fetch) stays JSON
+    if accepted[ARROW_STREAM_MIMETYPE] > accepted["application/json"]:
+        return arrow_response(df)
+    if hasattr(df, "to_pylist"):
+        # pyarrow.Table: records straight from the columns, no pandas round trip
+        return json_response(df.to_pylist())
+    return json_response(df.to_dict(orient="records"))
@@ -4,7 +4,9 @@ Database Setup Script
 This script creates a SQLite database and loads CSV files into corresponding tables.
 It includes error handling and validation to ensure data integrity.
 """
+import csv
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import os
 from pathlib import Path
@@ -86,10 +88,34 @@ CSV_MAPPING = {
 }
 
 
+PAGE_SIZE = 8192
+
+# Durability is irrelevant while building a fresh file from CSVs, so the
+# setup connection skips fsyncs, keeps the rollback journal and sort temp
+# files in memory, uses a ~200MB page cache and takes the file lock once.
+# None of these persist in the file; the server opens its own connections.
+SETUP_PRAGMAS = (
+    "PRAGMA synchronous=OFF",
+    "PRAGMA journal_mode=MEMORY",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-200000",
+    "PRAGMA locking_mode=EXCLUSIVE",
+    # The FOREIGN KEY clauses document the schema; they are not probed per
+    # inserted row during the build (this is also SQLite's default)
+    "PRAGMA foreign_keys=OFF",
+)
+
+
 def create_connection():
     """Create a connection to the SQLite database."""
     try:
         conn = sqlite3.connect(str(DATABASE_PATH))
+        # 8KB pages hold about twice the rows of the 4KB default, halving page
+        # reads for scans; only takes effect before the first table is created
+        # (or on the next VACUUM)
+        conn.execute(f"PRAGMA page_size={PAGE_SIZE}")
+        for pragma in SETUP_PRAGMAS:
+            conn.execute(pragma)
         print(f"Connected to database: {DATABASE_PATH}")
         return conn
     except sqlite3.Error as e:
@@ -150,6 +176,10 @@ def create_tables(conn):
                 returned_flag INTEGER,
                 quarter_bucket TEXT,
                 month TEXT,
+                -- Integer YYYYMMDD key: range filters and MIN/MAX compare
+                -- integers instead of date strings
+                date_key INTEGER GENERATED ALWAYS AS
+                    (CAST(strftime('%Y%m%d', date) AS INTEGER)) VIRTUAL,
                 FOREIGN KEY (sku_id) REFERENCES products(sku_id)
             )
         """)
@@ -185,8 +215,263 @@ def create_tables(conn):
         raise
 
 
+# Nullable pandas dtypes yield pd.NA for missing values; bind them as NULL
+sqlite3.register_adapter(type(pd.NA), lambda value: None)
+
+# SQLite declared column type -> pandas dtype used when parsing the CSV.
+# TEXT columns (including the YYYY-MM-DD date columns) are read as plain
+# strings: no type inference, no datetime round-trip, and numeric-looking
+# ids such as "00123" keep their leading zeros. Missing values stay NaN and
+# bind as NULL. REAL stays float64, since float32 would not round-trip
+# prices exactly.
+SQLITE_TO_PANDAS_DTYPE = {
+    "INTEGER": "Int64",
+    "REAL": "float64",
+    "TEXT": "str",
+}
+
+
+def schema_dtypes(conn, table_name, column_mapping):
+    """
+    Build a read_csv dtype mapping (keyed by CSV column) from the typed
+    schema created by create_tables, so numeric columns are not inferred.
+    """
+    declared = {
+        row[1]: row[2].upper()
+        for row in conn.execute(f"PRAGMA table_info({table_name})")
+    }
+    dtypes = {}
+    for csv_col, table_col in column_mapping.items():
+        dtype = SQLITE_TO_PANDAS_DTYPE.get(declared.get(table_col))
+        if dtype is not None:
+            dtypes[csv_col] = dtype
+    return dtypes
+
+
+# Rows parsed and inserted per step; bounds peak memory to one chunk
+# instead of the whole file
+CSV_CHUNK_ROWS = 500_000
+
+
+def read_csv_header(csv_path):
+    """Return the column names of a CSV without starting a pandas parser"""
+    # utf-8-sig strips a leading BOM, as the pandas and Arrow readers do, so
+    # the first column name still matches CSV_MAPPING
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        try:
+            return next(csv.reader(f))
+        except StopIteration:
+            raise pd.errors.EmptyDataError(f"No columns to parse from {csv_path.name}")
+
+
+def in_column_order(df, columns):
+    """Return df with exactly the given columns, reindexing only when they differ"""
+    if list(df.columns) == columns:
+        return df
+    return df[columns]
+
+
+# Bytes of CSV text Arrow's streaming reader decodes per batch
+CSV_BLOCK_BYTES = 64 << 20
+
+# pandas dtype from schema_dtypes -> Arrow column type for pyarrow.csv
+PANDAS_TO_ARROW_TYPE = {
+    "Int64": "int64",
+    "float64": "float64",
+    "str": "string",
+}
+
+
+def arrow_batch_to_pandas(batch):
+    """Convert an Arrow record batch to pandas, keeping nullable ints as Int64"""
+    import pyarrow as pa
+
+    return batch.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+
+
+def iter_arrow_csv_chunks(csv_path, columns, dtypes):
+    """
+    Yield DataFrames of the given columns decoded by Arrow's multithreaded
+    streaming CSV reader, with every column type given explicitly (so
+    date strings are never inferred as timestamps).
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pac
+
+    column_types = {col: pa.type_for_alias(PANDAS_TO_ARROW_TYPE[dtypes[col]]) for col in columns}
+    reader = pac.open_csv(
+        csv_path,
+        read_options=pac.ReadOptions(block_size=CSV_BLOCK_BYTES),
+        convert_options=pac.ConvertOptions(
+            include_columns=columns,
+            column_types=column_types,
+            strings_can_be_null=True,
+        ),
+    )
+    try:
+        for batch in reader:
+            yield in_column_order(arrow_batch_to_pandas(batch), columns)
+    finally:
+        reader.close()
+
+
+def iter_csv_chunks(csv_path, columns, dtypes=None):
+    """
+    Yield DataFrames holding only the given columns (in that order). When
+    every column has an explicit dtype and pyarrow is installed, Arrow's
+    streaming reader decodes the file CSV_BLOCK_BYTES at a time; otherwise
+    the pandas C parser streams it CSV_CHUNK_ROWS rows at a time.
+    """
+    dtypes = {col: dtype for col, dtype in (dtypes or {}).items() if col in columns}
+    if len(dtypes) == len(columns) and all(d in PANDAS_TO_ARROW_TYPE for d in dtypes.values()):
+        try:
+            import pyarrow.csv
+        except ImportError:
+            pass
+        else:
+            yield from iter_arrow_csv_chunks(csv_path, columns, dtypes)
+            return
+
+    with pd.read_csv(csv_path, usecols=columns, dtype=dtypes or None, engine="c",
+                     chunksize=CSV_CHUNK_ROWS) as reader:
+        for chunk in reader:
+            yield in_column_order(chunk, columns)
+
+
+def parquet_cache_path(csv_path):
+    """Typed Parquet copy of a CSV, written on the first load and read on rebuilds"""
+    return csv_path.with_suffix(".parquet")
+
+
+def iter_parquet_chunks(parquet_path, columns):
+    """Yield DataFrames of at most CSV_CHUNK_ROWS rows from a Parquet cache file"""
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(parquet_path)
+    for batch in parquet_file.iter_batches(batch_size=CSV_CHUNK_ROWS, columns=columns):
+        yield in_column_order(arrow_batch_to_pandas(batch), columns)
+
+
+def cache_chunks(chunks, parquet_path):
+    """
+    Yield chunks unchanged while also writing them to parquet_path.
+    Caching is best effort: if pyarrow is missing or a chunk does not fit the
+    schema of the first one, the cache is dropped and loading carries on. A
+    partially written file is removed so it is never mistaken for a cache.
+    """
+    writer = None
+    completed = False
+    try:
+        for chunk in chunks:
+            if writer is not False:
+                try:
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+
+                    schema = writer.schema if writer is not None else None
+                    table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(parquet_path, table.schema, compression="zstd")
+                    writer.write_table(table)
+                except (ImportError, OSError, ValueError, TypeError) as e:
+                    print(f"  Warning: not caching {parquet_path.name}: {e}")
+                    if writer is not None:
+                        writer.close()
+                    writer = False
+                    parquet_path.unlink(missing_ok=True)
+            yield chunk
+        completed = True
+    finally:
+        if writer:
+            writer.close()
+            if not completed:
+                parquet_path.unlink(missing_ok=True)
+
+
+def frame_rows(df):
+    """
+    Iterate a DataFrame's rows as plain tuples for executemany. Each column
+    is converted with Series.tolist(), so sqlite3 binds native Python
+    ints/floats/str (and pd.NA via its adapter) instead of boxing numpy
+    scalars row by row as itertuples does.
+    """
+    return zip(*[df[column].tolist() for column in df.columns])
+
+
+def prefetch_chunks(chunks):
+    """
+    Produce the next chunk on a worker thread while the caller inserts the
+    current one, so CSV/Parquet decoding overlaps the SQLite writes. Only
+    the worker touches the source iterator, and only the caller touches the
+    connection.
+    """
+    done = object()
+    iterator = iter(chunks)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(next, iterator, done)
+        while True:
+            chunk = future.result()
+            if chunk is done:
+                return
+            future = executor.submit(next, iterator, done)
+            yield chunk
+
+
+def insert_csv_rows(conn, csv_path, table_name, column_mapping, columns, dtypes=None):
+    """
+    Stream the given CSV columns into table_name chunk by chunk, reusing one
+    prepared INSERT. Explicit dtypes are applied when given; if the file does
+    not fit them (e.g. True/False flags), the table is cleared and the load
+    is retried with inferred types.
+
+    When the Parquet cache next to the CSV is at least as new as the CSV it
+    is read instead, skipping CSV parsing; otherwise the CSV is parsed and
+    the cache is rewritten along the way.
+
+    Returns:
+        Number of rows inserted
+    """
+    table_columns = ", ".join(column_mapping[col] for col in columns)
+    placeholders = ", ".join("?" * len(columns))
+    insert_sql = f"INSERT INTO {table_name} ({table_columns}) VALUES ({placeholders})"
+
+    def insert_chunks(chunks):
+        total = 0
+        for chunk in prefetch_chunks(chunks):
+            conn.executemany(insert_sql, frame_rows(chunk))
+            total += len(chunk)
+        return total
+
+    parquet_path = parquet_cache_path(csv_path)
+    if parquet_path.exists() and parquet_path.stat().st_mtime >= csv_path.stat().st_mtime:
+        try:
+            row_count = insert_chunks(iter_parquet_chunks(parquet_path, columns))
+            print(f"  - Read {parquet_path.name} instead of parsing {csv_path.name}")
+            return row_count
+        except (ImportError, OSError, ValueError, TypeError) as e:
+            # Missing pyarrow, a corrupt file or a cache lacking newly mapped columns
+            print(f"  Warning: could not read {parquet_path.name} ({e}); parsing CSV")
+            conn.execute(f"DELETE FROM {table_name}")
+
+    try:
+        return insert_chunks(cache_chunks(iter_csv_chunks(csv_path, columns, dtypes), parquet_path))
+    except (ValueError, TypeError) as e:
+        if not dtypes:
+            raise
+        print(f"  Warning: explicit dtypes did not apply ({e}); inferring column types")
+        conn.execute(f"DELETE FROM {table_name}")
+        return insert_chunks(cache_chunks(iter_csv_chunks(csv_path, columns), parquet_path))
+
+
 def load_csv_to_database(conn):
-    """Load CSV files into the database."""
+    """
+    Load CSV files into the database in a single transaction.
+
+    Returns:
+        Dict mapping each loaded table to the number of rows inserted
+    """
+    row_counts = {}
+    conn.execute("BEGIN")
     for csv_file, config in CSV_MAPPING.items():
         csv_path = CSV_DIR / csv_file
         table_name = config["table"]
@@ -200,21 +485,24 @@ def load_csv_to_database(conn):
                 print(f"  Warning: {csv_file} not found at {csv_path}")
                 continue
 
-            df = pd.read_csv(csv_path)
-            print(f"  - Read {len(df)} rows from {csv_file}")
-
-            # Select and rename columns
-            available_columns = [col for col in column_mapping.keys() if col in df.columns]
+            # Only the mapped columns are parsed; the rest are never decoded.
+            # Listing them in file order lets parsed chunks be inserted as-is
+            header = read_csv_header(csv_path)
+            available_columns = [col for col in header if col in column_mapping]
             if not available_columns:
                 print(f"  Warning: No matching columns found in {csv_file}")
                 continue
 
-            df_subset = df[available_columns].copy()
-            df_subset.rename(columns=column_mapping, inplace=True)
-
-            # Write to database
-            df_subset.to_sql(table_name, conn, if_exists="replace", index=False)
-            print(f"  Loaded {len(df_subset)} rows into '{table_name}' table")
+            # Insert into the typed table from create_tables, one chunk at a time.
+            # Clearing it first (instead of dropping/replacing it) keeps the
+            # declared keys and types when loading into an existing database
+            conn.execute(f"DELETE FROM {table_name}")
+            dtypes = schema_dtypes(conn, table_name, column_mapping)
+            row_count = insert_csv_rows(
+                conn, csv_path, table_name, column_mapping, available_columns, dtypes
+            )
+            row_counts[table_name] = row_count
+            print(f"  Loaded {row_count} rows into '{table_name}' table")
 
         except pd.errors.EmptyDataError:
             print(f"  Error: {csv_file} is empty")
@@ -224,9 +512,136 @@ def load_csv_to_database(conn):
             print(f"  Error loading {csv_file}: {e}")
             raise
 
+    conn.commit()
+    return row_counts
 
-def verify_database(conn):
-    """Verify the database was created correctly."""
+
+def create_summary_tables(conn):
+    """
+    Materialize denormalized tables the dashboard reads instead of joining
+    products and sales on every request.
+    """
+    try:
+        cursor = conn.cursor()
+
+        # Sales rows carrying the product attributes the dashboard filters on
+        cursor.execute("DROP TABLE IF EXISTS sales_fact")
+        cursor.execute("""
+            CREATE TABLE sales_fact AS
+            SELECT
+                s.sale_id,
+                s.date,
+                s.date_key,
+                s.sku_id,
+                s.quantity,
+                s.net_revenue,
+                p.product_name,
+                p.category,
+                p.default_price
+            FROM sales s
+            INNER JOIN products p ON s.sku_id = p.sku_id
+        """)
+        print("Created 'sales_fact' table")
+
+        # One row per product per day for the time-series chart
+        cursor.execute("DROP TABLE IF EXISTS daily_sales")
+        cursor.execute("""
+            CREATE TABLE daily_sales AS
+            SELECT
+                category,
+                product_name,
+                date_key,
+                date AS sale_date,
+                SUM(net_revenue) AS total_sales,
+                SUM(quantity) AS total_quantity
+            FROM sales_fact
+            GROUP BY category, product_name, date_key
+        """)
+        print("Created 'daily_sales' table")
+
+        # Tiny dimension tables backing the filter dropdowns, so they never
+        # run DISTINCT over products
+        cursor.execute("DROP TABLE IF EXISTS dim_category")
+        cursor.execute("CREATE TABLE dim_category (category_name TEXT PRIMARY KEY) WITHOUT ROWID")
+        cursor.execute("""
+            INSERT INTO dim_category (category_name)
+            SELECT DISTINCT category FROM products WHERE category IS NOT NULL
+        """)
+        print("Created 'dim_category' table")
+
+        # A rowid table with a UNIQUE index rather than a WITHOUT ROWID
+        # primary key: products.category is nullable, and WITHOUT ROWID
+        # primary key columns may not hold NULL. Products without a category
+        # are kept, so the products dropdown still lists them
+        cursor.execute("DROP TABLE IF EXISTS dim_product")
+        cursor.execute("""
+            CREATE TABLE dim_product (
+                category TEXT,
+                product_name TEXT NOT NULL,
+                UNIQUE (category, product_name)
+            )
+        """)
+        cursor.execute("""
+            INSERT INTO dim_product (category, product_name)
+            SELECT DISTINCT category, product_name FROM products
+        """)
+        print("Created 'dim_product' table")
+
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"Error creating summary tables: {e}")
+        raise
+
+
+# Covering indexes for the dashboard queries in backend/utils/database.py:
+# products are looked up by (category, product_name) for the forecast SKUs,
+# and sales_fact / daily_sales are range scanned by (category, product_name,
+# date_key), with summed columns read from the index itself.
+# idx_sales_date_key answers the year range from its two endpoints. No query
+# reads sales by (sku_id, date) any more, so it has no index of its own.
+INDEX_STATEMENTS = (
+    "CREATE INDEX IF NOT EXISTS idx_products_category_product "
+    "ON products(category, product_name, sku_id, default_price)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_date_key ON sales(date_key)",
+    "CREATE INDEX IF NOT EXISTS idx_sales_fact_category_product_date_key "
+    "ON sales_fact(category, product_name, date_key, quantity, net_revenue, sku_id, default_price)",
+    "CREATE INDEX IF NOT EXISTS idx_daily_sales_category_product_date_key "
+    "ON daily_sales(category, product_name, date_key, sale_date, total_sales, total_quantity)",
+)
+
+
+def create_indexes(conn):
+    """Create query indexes, refresh planner statistics and compact the file."""
+    try:
+        cursor = conn.cursor()
+        for statement in INDEX_STATEMENTS:
+            cursor.execute(statement)
+        print(f"Created {len(INDEX_STATEMENTS)} indexes")
+
+        # Populate sqlite_stat1 so the planner picks the new indexes
+        cursor.execute("ANALYZE")
+        conn.commit()
+        print("Analyzed database statistics")
+
+        # Rewrite the file contiguously, dropping pages freed by the summary
+        # table rebuilds (VACUUM cannot run inside a transaction)
+        conn.execute("VACUUM")
+        print("Vacuumed database")
+
+    except sqlite3.Error as e:
+        print(f"Error creating indexes: {e}")
+        raise
+
+
+def verify_database(conn, row_counts=None):
+    """
+    Verify the database was created correctly.
+
+    Row counts come from row_counts (as returned by load_csv_to_database),
+    then from the sqlite_stat1 statistics written by ANALYZE; only tables
+    missing from both are counted with COUNT(*).
+    """
     try:
         cursor = conn.cursor()
 
@@ -234,14 +649,27 @@ def verify_database(conn):
         cursor.execute(
             "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
         )
-        tables = cursor.fetchall()
-        print(f"\nDatabase contains {len(tables)} tables:")
+        table_names = [row[0] for row in cursor.fetchall()]
+        print(f"\nDatabase contains {len(table_names)} tables:")
 
-        for table in tables:
-            table_name = table[0]
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            count = cursor.fetchone()[0]
-            print(f"  - {table_name}: {count} rows")
+        counts = dict(row_counts or {})
+        try:
+            # The first stat value is the table's row count at ANALYZE time
+            for table_name, stat in cursor.execute("SELECT tbl, stat FROM sqlite_stat1"):
+                counts.setdefault(table_name, int(stat.split()[0]))
+        except sqlite3.OperationalError:
+            pass  # not analyzed yet
+
+        # Count the rest in one statement instead of one query per table
+        uncounted = [name for name in table_names if name not in counts]
+        if uncounted:
+            count_sql = "SELECT " + ", ".join(
+                f'(SELECT COUNT(*) FROM "{name}")' for name in uncounted
+            )
+            counts.update(zip(uncounted, cursor.execute(count_sql).fetchone()))
+
+        for table_name in table_names:
+            print(f"  - {table_name}: {counts[table_name]} rows")
 
     except sqlite3.Error as e:
         print(f"Error verifying database: {e}")
@@ -253,10 +681,14 @@ def main():
     connection = None
 
     try:
-        # Remove existing database if it exists
+        # Remove existing database if it exists, together with the WAL and
+        # journal files the backend's connections leave next to it, so a
+        # stale -wal is never replayed against the new file
         if DATABASE_PATH.exists():
             print(f"Removing existing database: {DATABASE_PATH}\n")
             os.remove(DATABASE_PATH)
+        for suffix in ("-wal", "-shm", "-journal"):
+            Path(f"{DATABASE_PATH}{suffix}").unlink(missing_ok=True)
 
         # Create connection
         connection = create_connection()
@@ -266,10 +698,14 @@ def main():
 
         # Load CSV files
         print("Loading CSV files into database...\n")
-        load_csv_to_database(connection)
+        row_counts = load_csv_to_database(connection)
+
+        # Precompute denormalized tables, then index everything
+        create_summary_tables(connection)
+        create_indexes(connection)
 
         # Verify database
-        verify_database(connection)
+        verify_database(connection, row_counts)
 
         print("\n" + "=" * 60)
         print("Database setup complete and all CSVs imported.")
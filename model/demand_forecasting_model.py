@@ -2,7 +2,6 @@ import numpy as np
 import pandas as pd
 import xgboost as xgb
 from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from typing import List, Dict, Tuple, Optional
 import warnings
 import os
@@ -10,8 +9,308 @@ import re
 import pickle
 import json
 from datetime import datetime, timedelta
+try:
+    # Optional: numexpr evaluates the elementwise feature expressions in one
+    # multithreaded pass without NumPy's intermediate temporaries
+    import numexpr as ne
+except ImportError:
+    ne = None
+try:
+    # Optional: with CuPy and a CUDA device, XGBoost trains and predicts on
+    # the GPU; everything falls back to the CPU otherwise
+    import cupy
+    HAS_GPU = cupy.cuda.runtime.getDeviceCount() > 0
+except Exception:
+    cupy = None
+    HAS_GPU = False
+try:
+    # Optional: with onnxruntime installed, a model saved with an ONNX
+    # export is served through an ONNX Runtime session instead of the
+    # XGBoost booster
+    import onnxruntime as ort
+except ImportError:
+    ort = None
 warnings.filterwarnings('ignore')
 
+# Below this many rows numexpr's dispatch overhead outweighs the fused pass
+NUMEXPR_MIN_ROWS = 100_000
+
+# Histogram bins per feature for the hist tree method (XGBoost's default)
+MAX_BIN = 256
+
+# Validation rows the ONNX export must reproduce before it is saved
+ONNX_CHECK_ROWS = 1000
+
+# Characters XGBoost feature names may not contain, replaced by '_'
+_FEATURE_NAME_RE = re.compile(r'[^\w\-]')
+
+# pandas.read_csv's default missing-value markers, given to pyarrow's CSV
+# reader so both readers turn the same cells (empty strings included) into NaN
+CSV_NULL_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None',
+    'n/a', 'nan', 'null',
+]
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """numerator / (denominator + 1e-10), the guarded ratio used by the features."""
+    if ne is not None and len(numerator) >= NUMEXPR_MIN_ROWS:
+        return ne.evaluate('numerator / (denominator + 1e-10)')
+    return numerator / (denominator + 1e-10)
+
+
+def _cyclical(values: np.ndarray, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """sin and cos of 2 * pi * values / period."""
+    if ne is not None and len(values) >= NUMEXPR_MIN_ROWS:
+        local_dict = {'values': values, 'two_pi': 2 * np.pi, 'period': float(period)}
+        return (ne.evaluate('sin(two_pi * values / period)', local_dict=local_dict),
+                ne.evaluate('cos(two_pi * values / period)', local_dict=local_dict))
+    angle = 2 * np.pi * values / period
+    return np.sin(angle), np.cos(angle)
+
+
+def regression_metrics(y_true, y_pred) -> Dict[str, float]:
+    """
+    MAE, RMSE, R² and MAPE (%) computed from one shared error array.
+    
+    Same values as sklearn's mean_absolute_error, mean_squared_error and
+    r2_score plus the guarded MAPE, without each metric re-validating the
+    inputs and recomputing the residuals.
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+    n = len(y_true)
+    
+    err = y_true - y_pred
+    ss_res = float(err @ err)
+    centered = y_true - y_true.mean()
+    ss_tot = float(centered @ centered)
+    if ss_tot != 0:
+        r2 = 1 - ss_res / ss_tot
+    else:
+        # sklearn's convention for a constant target
+        r2 = 1.0 if ss_res == 0 else 0.0
+    
+    mape = float(np.mean(np.abs(err / (y_true + 1e-10)))) * 100
+    np.abs(err, out=err)
+    
+    return {
+        'mae': float(err.mean()),
+        'rmse': float(np.sqrt(ss_res / n)),
+        'r2': r2,
+        'mape': mape
+    }
+
+
+def sanitize_feature_name(name) -> str:
+    """Sanitize a feature name for XGBoost compatibility."""
+    return _FEATURE_NAME_RE.sub('_', str(name))
+
+
+def fill_missing(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replace +/-inf and NaN with 0, in place on a frame the caller owns.
+    
+    Same result as df.replace([inf, -inf], nan).fillna(0), but each
+    column is checked once and only columns that contain such values are
+    rewritten, instead of two full-frame passes that copy every column.
+    """
+    for col in df.columns:
+        series = df[col]
+        kind = series.dtype.kind
+        if kind == 'f':
+            values = series.to_numpy()
+            if not np.isfinite(values).all():
+                df[col] = np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+        elif kind not in 'iubM' and series.isna().any():
+            # e.g. missing categorical values, encoded afterwards as '0'
+            df[col] = series.fillna(0)
+    return df
+
+
+def to_dmatrix(X, label=None, quantile: bool = False,
+               ref: Optional[xgb.DMatrix] = None,
+               feature_names: Optional[List[str]] = None,
+               nthread: int = -1) -> xgb.DMatrix:
+    """
+    Build a DMatrix from the features as one row-major float32 block
+    (XGBoost's native input type, so DMatrix does not copy or convert
+    again), keeping the column names as feature names.
+    
+    With quantile=True a QuantileDMatrix is built instead, storing the
+    features pre-binned for the hist tree method; pass the training
+    matrix as ref so other matrices reuse its bin edges.
+    
+    X is a DataFrame, or a 2-D array with its column names passed as
+    feature_names. nthread caps the threads used to build it (-1: every core).
+    """
+    if isinstance(X, pd.DataFrame):
+        if feature_names is None:
+            feature_names = [str(c) for c in X.columns]
+        X = X.to_numpy(dtype=np.float32)
+    data = np.ascontiguousarray(X, dtype=np.float32)
+    if label is not None:
+        label = np.asarray(label, dtype=np.float32)
+    if HAS_GPU:
+        # Device-resident input, so the booster does not copy it per call
+        data = cupy.asarray(data)
+    if quantile:
+        return xgb.QuantileDMatrix(data, label=label, feature_names=feature_names,
+                                   nthread=nthread, max_bin=MAX_BIN, ref=ref)
+    return xgb.DMatrix(data, label=label, feature_names=feature_names, nthread=nthread)
+
+
+def price_tier_promo_codes(df: pd.DataFrame, tier_classes=None) -> np.ndarray:
+    """
+    Composite (price_tier, promo_flag) code computed as
+    tier_code * 2 + promo_flag. Tier codes index tier_classes (the fitted
+    price_tier encoder's sorted classes, unseen tiers -1), or the sorted
+    tiers of df itself when no classes are given. This equals the groupby
+    ngroup over the sorted pairs whenever every pair occurs, without
+    building a groupby. Both trainers code the feature through this.
+    
+    Missing tiers are filled as fill_missing fills the price_tier column
+    before it is encoded, so they get the same tier code as in that column.
+    """
+    promo = df['promo_flag'].to_numpy()
+    if not np.isin(promo, (0, 1)).all():
+        return df.groupby(['price_tier', 'promo_flag']).ngroup().to_numpy()
+    
+    tiers = df['price_tier']
+    if tiers.isna().any():
+        tiers = fill_missing(tiers.to_frame())['price_tier']
+    tiers = tiers.astype(str)
+    if tier_classes is None:
+        tier, _ = pd.factorize(tiers, sort=True)
+    else:
+        tier = pd.Index(tier_classes).get_indexer(tiers)
+    return tier.astype(np.int64) * 2 + promo.astype(np.int64)
+
+
+def write_frame_csv(df: pd.DataFrame, path: str, append: bool = False) -> None:
+    """
+    Write a frame to CSV with pyarrow's C++ writer, falling back to pandas
+    when pyarrow is not installed. Dates are written as YYYY-MM-DD and
+    strings are quoted only when needed, as pandas writes them.
+    
+    With append=True rows are added to an existing file, with the header
+    written only when the file does not exist yet.
+    """
+    write_header = not (append and os.path.exists(path))
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        df.to_csv(path, index=False, mode='a' if append else 'w', header=write_header)
+        return
+    
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if 'Date' in table.column_names:
+        i = table.column_names.index('Date')
+        table = table.set_column(i, 'Date', table.column(i).cast(pa.date32()))
+    with open(path, 'ab' if append else 'wb') as f:
+        pacsv.write_csv(table, f, write_options=pacsv.WriteOptions(
+            include_header=write_header, quoting_style='needed'))
+
+
+def read_feature_data(data_path: str, filters: Optional[list] = None) -> pd.DataFrame:
+    """
+    Read a pre-engineered feature file with Date parsed as datetime.
+    
+    Parquet files are read directly. CSVs go through pyarrow's multithreaded
+    CSV reader when it is installed, otherwise through pandas.
+    
+    Args:
+        data_path: Path to the feature CSV or Parquet file
+        filters: Row filters pushed down into the Parquet reader (Parquet only)
+        
+    Returns:
+        Loaded dataframe
+    """
+    if data_path.endswith('.parquet'):
+        df = pd.read_parquet(data_path, filters=filters)
+    else:
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pacsv
+        except ImportError:
+            df = pd.read_csv(data_path)
+        else:
+            table = pacsv.read_csv(
+                data_path,
+                read_options=pacsv.ReadOptions(use_threads=True),
+                convert_options=pacsv.ConvertOptions(
+                    column_types={'Date': pa.timestamp('ns')},
+                    null_values=CSV_NULL_VALUES,
+                    strings_can_be_null=True
+                )
+            )
+            df = table.to_pandas(split_blocks=True, self_destruct=True)
+            del table
+    
+    # Drop unnamed index column if it exists (pandas names it 'Unnamed: 0',
+    # pyarrow leaves it as '')
+    unnamed = [col for col in ('Unnamed: 0', '') if col in df.columns]
+    if unnamed:
+        df = df.drop(columns=unnamed)
+    
+    # Convert Date to datetime, skipped when the reader already parsed it;
+    # the dates are ISO strings, so one fixed format avoids per-row inference
+    if 'Date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['Date']):
+        df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d', cache=True)
+    
+    return df
+
+
+def read_recent_feature_data(data_path: str, days: int) -> pd.DataFrame:
+    """
+    Read only the rows from the last `days` days of a feature file.
+    
+    A Parquet file, or the Parquet copy the forecast API writes next to the
+    CSV (used while it is newer than the CSV), is read as the Date column
+    alone to find the latest date, then with a Date filter pushed into the
+    reader so earlier row groups are skipped. Otherwise the whole CSV is
+    read and filtered.
+    
+    Args:
+        data_path: Path to the feature CSV or Parquet file
+        days: Number of most recent days to keep
+        
+    Returns:
+        Dataframe with the rows of the last `days` days
+    """
+    parquet_path = os.path.splitext(data_path)[0] + '.parquet'
+    if not data_path.endswith('.parquet') and not (
+            os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(data_path)):
+        parquet_path = None
+    
+    if parquet_path is not None:
+        try:
+            max_date = pd.read_parquet(parquet_path, columns=['Date'])['Date'].max()
+            start = pd.Timestamp(max_date) - pd.Timedelta(days=days - 1)
+            return read_feature_data(parquet_path, filters=[('Date', '>=', start)])
+        except (ImportError, OSError, ValueError) as e:
+            print(f"Could not read {parquet_path}, falling back to {data_path}: {e}")
+    
+    df = read_feature_data(data_path)
+    start = df['Date'].max() - pd.Timedelta(days=days - 1)
+    return df[df['Date'] >= start]
+
+
+# Booster file names, newest format first: binary UBJSON, then the JSON
+# written by earlier versions
+MODEL_FILES = ("xgboost_model.ubj", "xgboost_model.json")
+
+
+def find_model_file(model_dir: str) -> Optional[str]:
+    """Path of the saved booster in model_dir, or None if there is none."""
+    for name in MODEL_FILES:
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            return path
+    return None
+
 
 class DemandForecastingModel:
     """Production-ready XGBoost demand forecasting model with save/load capabilities."""
@@ -23,6 +322,12 @@ class DemandForecastingModel:
         self.target_col = 'quantity'
         self.target_transformer = None
         self.label_encoders = {}
+        self._label_maps = {}
+        self._onnx_session = None
+        # Threads per predict call, set by load_model (-1: every core)
+        self._nthread = -1
+        # Validation features kept from train() to check the ONNX export against
+        self._onnx_check_sample = None
         self.model_metadata = {}
         
     def load_data(self, data_path: str) -> pd.DataFrame:
@@ -30,90 +335,119 @@ class DemandForecastingModel:
         Load pre-engineered dataset.
         
         Args:
-            data_path: Path to the pre-engineered CSV file
+            data_path: Path to the pre-engineered CSV (or Parquet) file
             
         Returns:
             Loaded dataframe
         """
         print(f"Loading data from {data_path}")
-        df = pd.read_csv(data_path)
-        
-        # Drop unnamed index column if it exists
-        if 'Unnamed: 0' in df.columns:
-            df = df.drop(columns=['Unnamed: 0'])
-        
-        # Convert Date to datetime
-        if 'Date' in df.columns:
-            df['Date'] = pd.to_datetime(df['Date'])
+        df = read_feature_data(data_path)
         
         print(f"Loaded dataset shape: {df.shape}")
         print(f"Date range: {df['Date'].min()} to {df['Date'].max()}")
         print(f"Unique SKUs: {df['sku_id'].nunique()}")
         return df
     
-    def create_interaction_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Create interaction features between important variables."""
-        df = df.copy()
+    def _interaction_feature_block(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Compute interaction features between important variables as arrays."""
+        cols = df.columns
+        out = {}
         
         # Price and promotion interactions
-        if 'unit_price' in df.columns and 'promo_flag' in df.columns:
-            df['price_promo_interaction'] = df['unit_price'] * df['promo_flag']
-        
-        if 'discount_pct' in df.columns and 'promo_flag' in df.columns:
-            df['discount_intensity'] = df['discount_pct'] * df['promo_flag']
-        
-        # Seasonal interactions
-        if 'is_weekend' in df.columns and 'promo_flag' in df.columns:
-            df['weekend_promo'] = df['is_weekend'] * df['promo_flag']
-        
-        if 'month' in df.columns and 'promo_flag' in df.columns:
-            df['month_promo'] = df['month'] * df['promo_flag']
+        if 'promo_flag' in cols:
+            promo = df['promo_flag'].to_numpy()
+            if 'unit_price' in cols:
+                out['price_promo_interaction'] = df['unit_price'].to_numpy() * promo
+            
+            if 'discount_pct' in cols:
+                out['discount_intensity'] = df['discount_pct'].to_numpy() * promo
+            
+            # Seasonal interactions
+            if 'is_weekend' in cols:
+                out['weekend_promo'] = df['is_weekend'].to_numpy() * promo
+            
+            if 'month' in cols:
+                out['month_promo'] = df['month'].to_numpy() * promo
         
         # Rolling mean interactions
-        if 'rolling_mean_28' in df.columns and 'sales_lag_7' in df.columns:
-            df['current_vs_avg'] = df['sales_lag_7'] / (df['rolling_mean_28'] + 1e-10)
+        if 'rolling_mean_28' in cols and 'sales_lag_7' in cols:
+            out['current_vs_avg'] = _ratio(df['sales_lag_7'].to_numpy(), df['rolling_mean_28'].to_numpy())
         
         # Price tier interactions
-        if 'price_tier' in df.columns and 'promo_flag' in df.columns:
-            df['price_tier_promo'] = df.groupby(['price_tier', 'promo_flag']).ngroup()
+        if 'price_tier' in cols and 'promo_flag' in cols:
+            out['price_tier_promo'] = self._price_tier_promo_codes(df)
         
-        return df
+        return out
     
-    def create_advanced_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Create advanced statistical and domain-specific features."""
-        df = df.copy()
+    def _price_tier_promo_codes(self, df: pd.DataFrame) -> np.ndarray:
+        """price_tier_promo codes, with tier codes from the fitted price_tier classes."""
+        tier_classes = self._label_categories('price_tier') if 'price_tier' in self.label_encoders else None
+        return price_tier_promo_codes(df, tier_classes)
+    
+    def _advanced_feature_block(self, df: pd.DataFrame,
+                                interactions: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+        """Compute advanced statistical and domain-specific features as arrays."""
+        cols = df.columns
+        out = {}
         
         # Coefficient of variation (volatility measure)
-        if 'rolling_mean_28' in df.columns and 'rolling_std_28' in df.columns:
-            df['cv_28'] = df['rolling_std_28'] / (df['rolling_mean_28'] + 1e-10)
+        if 'rolling_mean_28' in cols and 'rolling_std_28' in cols:
+            out['cv_28'] = _ratio(df['rolling_std_28'].to_numpy(), df['rolling_mean_28'].to_numpy())
         
         # Momentum features
-        if 'sales_lag_7' in df.columns and 'sales_lag_14' in df.columns:
-            df['momentum_7_14'] = (df['sales_lag_7'] - df['sales_lag_14']) / (df['sales_lag_14'] + 1e-10)
-        
-        # Inventory turnover proxy
-        if 'sales_lag_7' in df.columns and 'rolling_mean_28' in df.columns:
-            df['turnover_proxy'] = df['sales_lag_7'] / (df['rolling_mean_28'] + 1e-10)
+        if 'sales_lag_7' in cols and 'sales_lag_14' in cols:
+            lag_7 = df['sales_lag_7'].to_numpy()
+            lag_14 = df['sales_lag_14'].to_numpy()
+            if ne is not None and len(df) >= NUMEXPR_MIN_ROWS:
+                out['momentum_7_14'] = ne.evaluate('(lag_7 - lag_14) / (lag_14 + 1e-10)')
+            else:
+                out['momentum_7_14'] = (lag_7 - lag_14) / (lag_14 + 1e-10)
+        
+        # Inventory turnover proxy (same ratio as current_vs_avg, reused when
+        # the interaction block already computed it)
+        if 'sales_lag_7' in cols and 'rolling_mean_28' in cols:
+            if interactions is not None and 'current_vs_avg' in interactions:
+                out['turnover_proxy'] = interactions['current_vs_avg']
+            else:
+                out['turnover_proxy'] = _ratio(df['sales_lag_7'].to_numpy(), df['rolling_mean_28'].to_numpy())
         
         # Price elasticity proxy
-        if 'price_change_7' in df.columns and 'pct_change_7' in df.columns:
-            df['price_elasticity_proxy'] = df['pct_change_7'] / (df['price_change_7'] + 1e-10)
+        if 'price_change_7' in cols and 'pct_change_7' in cols:
+            out['price_elasticity_proxy'] = _ratio(df['pct_change_7'].to_numpy(), df['price_change_7'].to_numpy())
         
         # Seasonal decomposition features
-        if 'month' in df.columns:
-            df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
-            df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
+        if 'month' in cols:
+            out['month_sin'], out['month_cos'] = _cyclical(df['month'].to_numpy(), 12)
         
-        if 'day_of_week' in df.columns:
-            df['day_sin'] = np.sin(2 * np.pi * df['day_of_week'] / 7)
-            df['day_cos'] = np.cos(2 * np.pi * df['day_of_week'] / 7)
+        if 'day_of_week' in cols:
+            out['day_sin'], out['day_cos'] = _cyclical(df['day_of_week'].to_numpy(), 7)
         
-        return df
+        return out
+    
+    def create_interaction_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Create interaction features between important variables."""
+        return df.assign(**self._interaction_feature_block(df))
+    
+    def create_advanced_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Create advanced statistical and domain-specific features."""
+        return df.assign(**self._advanced_feature_block(df))
+    
+    def create_derived_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Create the interaction and advanced features in one pass: every
+        derived column is computed on NumPy arrays and attached with a single
+        assign, instead of one copy and block insert per column.
+        """
+        interactions = self._interaction_feature_block(df)
+        advanced = self._advanced_feature_block(df, interactions)
+        return df.assign(**interactions, **advanced)
     
     def encode_categorical_features(self, train_df: pd.DataFrame, 
                                    val_df: pd.DataFrame = None, 
                                    test_df: pd.DataFrame = None,
-                                   fit: bool = True) -> Tuple:
+                                   fit: bool = True,
+                                   copy: bool = True,
+                                   prefitted: Tuple[str, ...] = ()) -> Tuple:
         """
         Encode categorical features using label encoding.
         
@@ -122,49 +456,71 @@ class DemandForecastingModel:
             val_df: Validation dataframe (optional)
             test_df: Test dataframe (optional)
             fit: Whether to fit encoders (True for training, False for inference)
+            copy: Whether to encode copies of the dataframes; pass False when
+                the caller owns them, to encode in place without a full copy
+            prefitted: Columns whose encoders were already fitted for this
+                training run; in fit mode they are applied, not refitted
             
         Returns:
             Tuple of encoded dataframes
         """
         categorical_cols = ['category', 'sub_category', 'brand', 'product_type', 'size_label', 'price_tier']
         
-        train_encoded = train_df.copy()
+        train_encoded = train_df.copy() if copy else train_df
         
         for col in categorical_cols:
             if col in train_encoded.columns:
-                if fit:
-                    # Training mode: fit and transform
-                    le = LabelEncoder()
-                    train_encoded[col] = le.fit_transform(train_encoded[col].astype(str))
-                    self.label_encoders[col] = le
+                if fit and col not in prefitted:
+                    # Training mode: fit and transform with one hash-based
+                    # factorize; sorting only the uniques gives the same
+                    # classes_ and codes as LabelEncoder.fit_transform
+                    train_encoded[col] = self._fit_label_encoder(col, train_encoded[col])
+                    le = self.label_encoders[col]
                     print(f"    Encoded {col}: {len(le.classes_)} unique values")
                 else:
-                    # Inference mode: transform using existing encoder
+                    # Inference mode (or a prefitted column): transform
+                    # using existing encoder
                     if col in self.label_encoders:
-                        le = self.label_encoders[col]
-                        train_encoded[col] = train_encoded[col].astype(str).apply(
-                            lambda x: le.transform([x])[0] if x in le.classes_ else -1
-                        )
+                        train_encoded[col] = self._apply_label_map(train_encoded[col], col)
         
         # Handle validation and test sets if provided
         if val_df is not None and test_df is not None:
-            val_encoded = val_df.copy()
-            test_encoded = test_df.copy()
+            val_encoded = val_df.copy() if copy else val_df
+            test_encoded = test_df.copy() if copy else test_df
             
             for col in categorical_cols:
                 if col in val_encoded.columns and col in self.label_encoders:
-                    le = self.label_encoders[col]
-                    val_encoded[col] = val_encoded[col].astype(str).apply(
-                        lambda x: le.transform([x])[0] if x in le.classes_ else -1
-                    )
-                    test_encoded[col] = test_encoded[col].astype(str).apply(
-                        lambda x: le.transform([x])[0] if x in le.classes_ else -1
-                    )
+                    val_encoded[col] = self._apply_label_map(val_encoded[col], col)
+                    test_encoded[col] = self._apply_label_map(test_encoded[col], col)
             
             return train_encoded, val_encoded, test_encoded
         
         return train_encoded
     
+    def _fit_label_encoder(self, col: str, series: pd.Series) -> np.ndarray:
+        """Fit the label encoder for a column and return its int32 codes."""
+        codes, uniques = pd.factorize(series.astype(str), sort=True)
+        le = LabelEncoder()
+        le.classes_ = np.asarray(uniques, dtype=object)
+        self.label_encoders[col] = le
+        self._label_maps.pop(col, None)
+        return codes.astype(np.int32)
+    
+    def _label_categories(self, col: str) -> pd.Index:
+        """Fitted classes of a column's encoder as a cached pd.Index."""
+        categories = self._label_maps.get(col)
+        if categories is None:
+            categories = self._label_maps[col] = pd.Index(self.label_encoders[col].classes_)
+        return categories
+    
+    def _apply_label_map(self, series: pd.Series, col: str) -> pd.Series:
+        """
+        Encode a column with the fitted encoder's classes in one vectorized
+        hash lookup (Index.get_indexer). Unseen values become -1.
+        """
+        codes = self._label_categories(col).get_indexer(series.astype(str))
+        return pd.Series(codes.astype(np.int32), index=series.index, name=series.name)
+    
     def _transform_target(self, x):
         """Transform target using log1p."""
         return np.log1p(x)
@@ -206,10 +562,21 @@ class DemandForecastingModel:
         print(f"  Validation: {val_start.date()} to {(test_start - pd.Timedelta(days=1)).date()}")
         print(f"  Test: {test_start.date()} to {max_date.date()}")
         
-        # Create splits
-        train_df = df[df['Date'] < val_start].copy()
-        val_df = df[(df['Date'] >= val_start) & (df['Date'] < test_start)].copy()
-        test_df = df[df['Date'] >= test_start].copy()
+        # Create splits. On date-ordered data the cutoffs are two binary
+        # searches and the splits are slices; other row orders keep the
+        # masks so rows stay in their input order. The splits are only read
+        # downstream (feature creation returns new frames), so no copies
+        dates = df['Date']
+        if dates.is_monotonic_increasing:
+            i_val = dates.searchsorted(val_start, side='left')
+            i_test = dates.searchsorted(test_start, side='left')
+            train_df = df.iloc[:i_val]
+            val_df = df.iloc[i_val:i_test]
+            test_df = df.iloc[i_test:]
+        else:
+            train_df = df[dates < val_start]
+            val_df = df[(dates >= val_start) & (dates < test_start)]
+            test_df = df[dates >= test_start]
         
         print(f"  Train: {len(train_df):,} rows")
         print(f"  Validation: {len(val_df):,} rows")
@@ -229,72 +596,79 @@ class DemandForecastingModel:
             Processed dataframe
         """
         # Add features
-        df = self.create_interaction_features(df)
-        df = self.create_advanced_features(df)
+        df = self.create_derived_features(df)
         
         # Handle infinite values
-        df = df.replace([np.inf, -np.inf], np.nan)
-        df = df.fillna(0)
+        df = fill_missing(df)
         
         # Encode categorical features
-        df = self.encode_categorical_features(df, fit=fit)
+        # (df is a fresh frame from the steps above, so it is encoded in place)
+        df = self.encode_categorical_features(df, fit=fit, copy=False)
         
         return df
     
     def sanitize_feature_name(self, name: str) -> str:
         """Sanitize feature names for XGBoost compatibility."""
-        return re.sub(r'[^\w\-]', '_', str(name))
+        return sanitize_feature_name(name)
     
     def prepare_model_data(self, train_df: pd.DataFrame, val_df: pd.DataFrame, 
                           test_df: pd.DataFrame) -> Tuple:
         """Prepare data for model training."""
         print("\nPreparing model data...")
         
+        # Fit the price_tier classes once, up front, on the training tiers
+        # filled the way fill_missing fills the column below, so
+        # price_tier_promo and the encoded price_tier column use the same
+        # codes in every split and at inference
+        prefitted = ()
+        if 'price_tier' in train_df.columns:
+            train_tiers = fill_missing(train_df[['price_tier']].copy())['price_tier']
+            self._fit_label_encoder('price_tier', train_tiers)
+            prefitted = ('price_tier',)
+        
         # Add features
         print("Creating features...")
-        train_df = self.create_interaction_features(train_df)
-        val_df = self.create_interaction_features(val_df)
-        test_df = self.create_interaction_features(test_df)
-        
-        train_df = self.create_advanced_features(train_df)
-        val_df = self.create_advanced_features(val_df)
-        test_df = self.create_advanced_features(test_df)
+        train_df = self.create_derived_features(train_df)
+        val_df = self.create_derived_features(val_df)
+        test_df = self.create_derived_features(test_df)
         
         # Handle infinite values
-        train_df = train_df.replace([np.inf, -np.inf], np.nan).fillna(0)
-        val_df = val_df.replace([np.inf, -np.inf], np.nan).fillna(0)
-        test_df = test_df.replace([np.inf, -np.inf], np.nan).fillna(0)
+        train_df = fill_missing(train_df)
+        val_df = fill_missing(val_df)
+        test_df = fill_missing(test_df)
         
         # Encode categorical features
         print("Encoding categorical features...")
         train_encoded, val_encoded, test_encoded = self.encode_categorical_features(
-            train_df, val_df, test_df, fit=True
+            train_df, val_df, test_df, fit=True, copy=False, prefitted=prefitted
         )
         
         # Define feature columns
         exclude_cols = ['sku_id', 'Date', self.target_col]
         self.feature_cols = [col for col in train_encoded.columns if col not in exclude_cols]
         
-        # Sanitize feature names
+        # Sanitize feature names (once per column, reused for the list below)
         feature_name_mapping = {col: self.sanitize_feature_name(col) for col in self.feature_cols}
         
         train_encoded = train_encoded.rename(columns=feature_name_mapping)
         val_encoded = val_encoded.rename(columns=feature_name_mapping)
         test_encoded = test_encoded.rename(columns=feature_name_mapping)
         
-        self.feature_cols = [self.sanitize_feature_name(col) for col in self.feature_cols]
+        self.feature_cols = [feature_name_mapping[col] for col in self.feature_cols]
         
         print(f"Number of features: {len(self.feature_cols)}")
         
-        # Prepare X and y
-        X_train = train_encoded[self.feature_cols].copy()
-        y_train = train_encoded[self.target_col].copy()
+        # Prepare X and y. Features are float32, the type XGBoost converts
+        # everything to internally, so DMatrix construction reads half the
+        # bytes (category codes are small integers and stay exact)
+        X_train = train_encoded[self.feature_cols].astype(np.float32)
+        y_train = train_encoded[self.target_col]
         
-        X_val = val_encoded[self.feature_cols].copy()
-        y_val = val_encoded[self.target_col].copy()
+        X_val = val_encoded[self.feature_cols].astype(np.float32)
+        y_val = val_encoded[self.target_col]
         
-        X_test = test_encoded[self.feature_cols].copy()
-        y_test = test_encoded[self.target_col].copy()
+        X_test = test_encoded[self.feature_cols].astype(np.float32)
+        y_test = test_encoded[self.target_col]
         
         # Apply target transformation
         print("Applying target transformation...")
@@ -326,11 +700,17 @@ class DemandForecastingModel:
             'reg_alpha': 1.0,
             'reg_lambda': 5.0,
             'random_state': 42,
-            'n_jobs': -1
+            'n_jobs': -1,
+            'tree_method': 'hist',
+            'max_bin': MAX_BIN
         }
+        if HAS_GPU:
+            params['device'] = 'cuda'
         
-        dtrain = xgb.DMatrix(X_train, label=y_train)
-        dval = xgb.DMatrix(X_val, label=y_val)
+        # Features are quantized once into histogram bins shared by both
+        # matrices, instead of kept as raw floats
+        dtrain = to_dmatrix(X_train, label=y_train, quantile=True)
+        dval = to_dmatrix(X_val, label=y_val, quantile=True, ref=dtrain)
         
         evals = [(dtrain, 'train'), (dval, 'validation')]
         
@@ -342,6 +722,7 @@ class DemandForecastingModel:
             early_stopping_rounds=100,
             verbose_eval=100
         )
+        self._onnx_check_sample = X_val.iloc[:ONNX_CHECK_ROWS].to_numpy(dtype=np.float32)
         
         # Store metadata
         self.model_metadata = {
@@ -364,7 +745,7 @@ class DemandForecastingModel:
         Returns:
             Dictionary containing metrics and predictions
         """
-        dmatrix = xgb.DMatrix(X)
+        dmatrix = to_dmatrix(X)
         y_pred_transformed = self.model.predict(dmatrix)
         
         # Transform back to original space
@@ -375,10 +756,8 @@ class DemandForecastingModel:
             y_pred = np.maximum(y_pred_transformed, 0)
             y_true = y
         
-        mae = mean_absolute_error(y_true, y_pred)
-        rmse = np.sqrt(mean_squared_error(y_true, y_pred))
-        r2 = r2_score(y_true, y_pred)
-        mape = np.mean(np.abs((y_true - y_pred) / (y_true + 1e-10))) * 100
+        metrics = regression_metrics(y_true, y_pred)
+        mae, rmse, r2, mape = metrics['mae'], metrics['rmse'], metrics['r2'], metrics['mape']
         
         print(f"\n{dataset_name} Metrics:")
         print(f"  MAE:  {mae:.4f}")
@@ -407,21 +786,22 @@ class DemandForecastingModel:
         
         os.makedirs(model_dir, exist_ok=True)
         
-        # Save XGBoost model
-        model_path = os.path.join(model_dir, "xgboost_model.json")
+        # Save XGBoost model (binary UBJSON: smaller and faster to load than JSON)
+        model_path = os.path.join(model_dir, MODEL_FILES[0])
         self.model.save_model(model_path)
         print(f"Saved XGBoost model to {model_path}")
         
+        # Also export to ONNX when onnxmltools is installed
+        self._export_onnx(os.path.join(model_dir, "model.onnx"))
+        
         # Save feature columns
         features_path = os.path.join(model_dir, "feature_columns.json")
         with open(features_path, 'w') as f:
             json.dump(self.feature_cols, f, indent=2)
         print(f"Saved feature columns to {features_path}")
         
-        # Save label encoders
-        encoders_path = os.path.join(model_dir, "label_encoders.pkl")
-        with open(encoders_path, 'wb') as f:
-            pickle.dump(self.label_encoders, f)
+        # Save label encoder classes as plain string arrays (no pickle)
+        encoders_path = self._save_label_encoders(model_dir)
         print(f"Saved label encoders to {encoders_path}")
         
         # Save target transformer
@@ -438,20 +818,128 @@ class DemandForecastingModel:
         
         print(f"\nModel successfully saved to {model_dir}/")
     
-    def load_model(self, model_dir: str = "saved_models") -> None:
+    def _export_onnx(self, onnx_path: str) -> None:
+        """
+        Export the booster to ONNX for inference through ONNX Runtime.
+        Skipped when onnxmltools is not installed; a failed conversion only
+        prints a warning, since the booster file is always saved.
+        
+        The export is only written when ONNX Runtime reproduces the booster's
+        predictions on the validation rows kept from train(), since the
+        conversion can drift (e.g. on base_score).
+        """
+        # Never leave an export from an earlier model next to this one
+        if os.path.exists(onnx_path):
+            os.remove(onnx_path)
+        
+        try:
+            import onnxmltools
+            from onnxmltools.convert.common.data_types import FloatTensorType
+        except ImportError:
+            return
+        
+        # The converter expects XGBoost's positional f0, f1, ... names; the
+        # ONNX input takes the columns in feature_cols order
+        booster = self.model.copy()
+        booster.feature_names = None
+        booster.feature_types = None
+        try:
+            onnx_model = onnxmltools.convert_xgboost(
+                booster, initial_types=[('input', FloatTensorType([None, len(self.feature_cols)]))]
+            )
+            serialized = onnx_model.SerializeToString()
+        except Exception as e:
+            print(f"Could not export ONNX model: {e}")
+            return
+        
+        sample = self._onnx_check_sample
+        if ort is None or sample is None or len(sample) == 0:
+            print("Skipped ONNX export: no onnxruntime or validation sample to check it against")
+            return
+        try:
+            session = ort.InferenceSession(serialized, providers=["CPUExecutionProvider"])
+            onnx_pred = session.run(None, {'input': sample})[0].ravel()
+        except Exception as e:
+            print(f"Skipped ONNX export: ONNX Runtime could not run it: {e}")
+            return
+        booster_pred = self.model.predict(to_dmatrix(sample, feature_names=self.feature_cols))
+        if not np.allclose(onnx_pred, booster_pred, rtol=1e-4, atol=1e-4):
+            max_diff = float(np.max(np.abs(onnx_pred - booster_pred)))
+            print(f"Skipped ONNX export: predictions differ from the booster "
+                  f"(max abs diff {max_diff:.6g} on {len(sample)} validation rows)")
+            return
+        
+        with open(onnx_path, 'wb') as f:
+            f.write(serialized)
+        print(f"Saved ONNX model to {onnx_path}")
+    
+    def _save_label_encoders(self, model_dir: str) -> str:
+        """Write the encoders' classes to label_encoders.npz and return its path."""
+        encoders_path = os.path.join(model_dir, "label_encoders.npz")
+        np.savez_compressed(encoders_path, **{
+            col: np.asarray(le.classes_, dtype=str) for col, le in self.label_encoders.items()
+        })
+        return encoders_path
+    
+    def _load_label_encoders(self, model_dir: str) -> None:
+        """
+        Load the encoders from the class arrays in label_encoders.npz, or
+        from the pickled encoders of models saved before it existed.
+        """
+        encoders_path = os.path.join(model_dir, "label_encoders.npz")
+        if os.path.exists(encoders_path):
+            self.label_encoders = {}
+            with np.load(encoders_path, allow_pickle=False) as arrays:
+                for col in arrays.files:
+                    le = LabelEncoder()
+                    le.classes_ = arrays[col].astype(object)
+                    self.label_encoders[col] = le
+        else:
+            with open(os.path.join(model_dir, "label_encoders.pkl"), 'rb') as f:
+                self.label_encoders = pickle.load(f)
+        self._label_maps = {}
+    
+    def load_model(self, model_dir: str = "saved_models", nthread: Optional[int] = None) -> None:
         """
         Load trained model and all artifacts.
         
         Args:
             model_dir: Directory containing model artifacts
+            nthread: Threads each predict call may use (default: every core).
+                A server running several predictions concurrently should
+                pass its share of the cores instead, so concurrent requests
+                do not oversubscribe the CPU
         """
         print(f"Loading model from {model_dir}/...")
+        if nthread is None:
+            nthread = os.cpu_count() or 1
+        self._nthread = nthread
         
         # Load XGBoost model
-        model_path = os.path.join(model_dir, "xgboost_model.json")
+        model_path = find_model_file(model_dir)
+        if model_path is None:
+            raise FileNotFoundError(f"No saved XGBoost model in {model_dir}")
         self.model = xgb.Booster()
         self.model.load_model(model_path)
-        print(f"Loaded XGBoost model")
+        # Runtime parameters are not stored in the model file
+        self.model.set_param({'nthread': nthread})
+        if HAS_GPU:
+            self.model.set_param({'device': 'cuda'})
+        print(f"Loaded XGBoost model{' (GPU)' if HAS_GPU else ''}")
+        
+        # Serve CPU inference through ONNX Runtime when the export exists
+        onnx_path = os.path.join(model_dir, "model.onnx")
+        self._onnx_session = None
+        if ort is not None and not HAS_GPU and os.path.exists(onnx_path):
+            # All graph optimizations, nthread cores inside the tree
+            # ensemble, nodes run sequentially
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            options.intra_op_num_threads = nthread
+            options.inter_op_num_threads = 1
+            self._onnx_session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+            print("Loaded ONNX model for inference")
         
         # Load feature columns
         features_path = os.path.join(model_dir, "feature_columns.json")
@@ -460,9 +948,7 @@ class DemandForecastingModel:
         print(f"Loaded {len(self.feature_cols)} feature columns")
         
         # Load label encoders
-        encoders_path = os.path.join(model_dir, "label_encoders.pkl")
-        with open(encoders_path, 'rb') as f:
-            self.label_encoders = pickle.load(f)
+        self._load_label_encoders(model_dir)
         print(f"Loaded label encoders")
         
         # Load target transformer
@@ -480,6 +966,48 @@ class DemandForecastingModel:
         
         print("\nModel successfully loaded and ready for inference")
     
+    def _feature_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Inference features as one float32 matrix in feature_cols order.
+        
+        Same values as prepare_features(df, fit=False)[self.feature_cols],
+        but each column is derived, filled and encoded as a 1-D array and
+        written straight into its slot of the matrix, without assembling the
+        wide intermediate frame.
+        """
+        interactions = self._interaction_feature_block(df)
+        derived = {**interactions, **self._advanced_feature_block(df, interactions)}
+        
+        X = np.empty((len(df), len(self.feature_cols)), dtype=np.float32)
+        for j, col in enumerate(self.feature_cols):
+            values = derived.get(col)
+            if values is None:
+                series = df[col]
+                if col in self.label_encoders:
+                    # Filled exactly as fill_missing filled it at training
+                    # time, float columns included, before the lookup
+                    if series.isna().any():
+                        series = fill_missing(series.to_frame())[col]
+                    series = self._apply_label_map(series, col)
+                elif series.dtype.kind not in 'fiubM' and series.isna().any():
+                    series = series.fillna(0)
+                values = series.to_numpy()
+            # Handle infinite values
+            if values.dtype.kind == 'f' and not np.isfinite(values).all():
+                values = np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+            X[:, j] = values
+        return X
+    
+    def _model_input(self, df: pd.DataFrame):
+        """
+        Model input for a frame: the float32 feature matrix for the ONNX
+        session, otherwise a DMatrix.
+        """
+        X = self._feature_matrix(df)
+        if self._onnx_session is not None:
+            return X
+        return to_dmatrix(X, feature_names=self.feature_cols, nthread=self._nthread)
+    
     def predict(self, df: pd.DataFrame) -> np.ndarray:
         """
         Make predictions on new data.
@@ -493,15 +1021,11 @@ class DemandForecastingModel:
         if self.model is None:
             raise ValueError("No model loaded. Call load_model() first.")
         
-        # Prepare features (without fitting transformers)
-        df_processed = self.prepare_features(df, fit=False)
-        
-        # Ensure we have all required features
-        X = df_processed[self.feature_cols].copy()
-        
-        # Make predictions
-        dmatrix = xgb.DMatrix(X)
-        y_pred_transformed = self.model.predict(dmatrix)
+        model_input = self._model_input(df)
+        if self._onnx_session is not None:
+            y_pred_transformed = self._onnx_session.run(None, {'input': model_input})[0].ravel()
+        else:
+            y_pred_transformed = self.model.predict(model_input)
         
         # Transform back to original space
         if self.target_transformer:
@@ -13,7 +13,24 @@ import os
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from demand_forecasting_model import DemandForecastingModel
+from demand_forecasting_model import (
+    DemandForecastingModel, find_model_file, read_feature_data, regression_metrics, write_frame_csv
+)
+
+# Parsed inference data, keyed by (data path, file mtime), so running several
+# horizons reads the file once
+_DATA_CACHE = {}
+
+
+def read_inference_data(data_path: str) -> pd.DataFrame:
+    """Read the inference data once per file modification time."""
+    cache_key = (data_path, os.path.getmtime(data_path))
+    df = _DATA_CACHE.get(cache_key)
+    if df is None:
+        df = read_feature_data(data_path)
+        _DATA_CACHE.clear()
+        _DATA_CACHE[cache_key] = df
+    return df
 
 
 def load_inference_data(data_path: str, forecast_horizon: int) -> pd.DataFrame:
@@ -21,29 +38,22 @@ def load_inference_data(data_path: str, forecast_horizon: int) -> pd.DataFrame:
     Load data for making predictions.
     
     Args:
-        data_path: Path to the data CSV
+        data_path: Path to the data CSV (or Parquet) file
         forecast_horizon: Number of days to forecast
         
     Returns:
         Dataframe with data for the forecast period
     """
     print(f"Loading data for {forecast_horizon}-day forecast...")
-    df = pd.read_csv(data_path)
-    
-    # Drop unnamed index column if it exists
-    if 'Unnamed: 0' in df.columns:
-        df = df.drop(columns=['Unnamed: 0'])
-    
-    # Convert Date to datetime
-    if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'])
+    df = read_inference_data(data_path)
     
     # Get the most recent data for forecasting
     max_date = df['Date'].max()
     forecast_start = max_date - pd.Timedelta(days=forecast_horizon - 1)
     
-    # Filter data for the forecast period
-    forecast_df = df[df['Date'] >= forecast_start].copy()
+    # Filter data for the forecast period (the mask already selects a new
+    # frame, and nothing downstream writes to it, so it is not copied again)
+    forecast_df = df[df['Date'] >= forecast_start]
     
     print(f"Forecast period: {forecast_start.date()} to {max_date.date()}")
     print(f"Data shape: {forecast_df.shape}")
@@ -53,7 +63,7 @@ def load_inference_data(data_path: str, forecast_horizon: int) -> pd.DataFrame:
 
 
 def generate_forecast(model: DemandForecastingModel, forecast_df: pd.DataFrame, 
-                     forecast_horizon: int) -> pd.DataFrame:
+                     forecast_horizon: int, predictions: np.ndarray = None) -> pd.DataFrame:
     """
     Generate forecasts using the loaded model.
     
@@ -61,6 +71,8 @@ def generate_forecast(model: DemandForecastingModel, forecast_df: pd.DataFrame,
         model: Loaded forecasting model
         forecast_df: Dataframe with forecast period data
         forecast_horizon: Number of days being forecast
+        predictions: Predictions for forecast_df's rows when already computed
+            (e.g. sliced from a longer horizon's batch); predicted here if omitted
         
     Returns:
         Dataframe with predictions
@@ -68,7 +80,8 @@ def generate_forecast(model: DemandForecastingModel, forecast_df: pd.DataFrame,
     print(f"\nGenerating {forecast_horizon}-day forecast...")
     
     # Make predictions
-    predictions = model.predict(forecast_df)
+    if predictions is None:
+        predictions = model.predict(forecast_df)
     
     # Create results dataframe
     results_df = pd.DataFrame({
@@ -84,12 +97,8 @@ def generate_forecast(model: DemandForecastingModel, forecast_df: pd.DataFrame,
     # Calculate error metrics if actuals are available
     if 'quantity' in forecast_df.columns:
         actuals = forecast_df['quantity'].values
-        from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-        
-        mae = mean_absolute_error(actuals, predictions)
-        rmse = np.sqrt(mean_squared_error(actuals, predictions))
-        r2 = r2_score(actuals, predictions)
-        mape = np.mean(np.abs((actuals - predictions) / (actuals + 1e-10))) * 100
+        metrics = regression_metrics(actuals, predictions)
+        mae, rmse, r2, mape = metrics['mae'], metrics['rmse'], metrics['r2'], metrics['mape']
         
         print(f"\nForecast Performance ({forecast_horizon}-day horizon):")
         print(f"  MAE:  {mae:.4f}")
@@ -125,7 +134,7 @@ def save_forecast(results_df: pd.DataFrame, forecast_horizon: int,
     available_cols = [col for col in column_order if col in results_df.columns]
     results_df = results_df[available_cols]
     
-    results_df.to_csv(filepath, index=False)
+    write_frame_csv(results_df, filepath)
     print(f"\nForecast saved to: {filepath}")
     print(f"  Total predictions: {len(results_df):,}")
     print(f"  Date range: {results_df['Date'].min()} to {results_df['Date'].max()}")
@@ -145,7 +154,7 @@ def run_production_inference():
     OUTPUT_DIR = "forecasts"
     
     # Check if model exists
-    if not os.path.exists(os.path.join(MODEL_DIR, "xgboost_model.json")):
+    if find_model_file(MODEL_DIR) is None:
         print(f"\nError: No trained model found in '{MODEL_DIR}/'")
         print("Please run 'python train_model.py' first to train the model.")
         sys.exit(1)
@@ -188,6 +197,17 @@ def run_production_inference():
             print("\n\nOperation cancelled by user.")
             sys.exit(0)
     
+    # Predict once over the longest horizon in a single batch; every shorter
+    # horizon is the most recent part of that window
+    max_horizon = max(horizons)
+    print(f"\n[2/3] Loading data for {max_horizon}-day forecast window...")
+    window_df = load_inference_data(DATA_PATH, max_horizon)
+    
+    print(f"\n[3/3] Generating predictions...")
+    window_predictions = model.predict(window_df)
+    window_dates = window_df['Date'].to_numpy()
+    max_date = window_df['Date'].max()
+    
     # Generate forecasts for selected horizons
     all_results = []
     
@@ -196,13 +216,13 @@ def run_production_inference():
         print(f"FORECAST HORIZON: {horizon} DAYS")
         print("="*70)
         
-        # Load data for this horizon
-        print(f"\n[2/3] Loading data for {horizon}-day forecast...")
-        forecast_df = load_inference_data(DATA_PATH, horizon)
-        
-        # Generate forecast
-        print(f"\n[3/3] Generating predictions...")
-        results_df = generate_forecast(model, forecast_df, horizon)
+        # Slice this horizon's rows and predictions out of the batch
+        forecast_start = max_date - pd.Timedelta(days=horizon - 1)
+        in_horizon = window_dates >= forecast_start.to_datetime64()
+        forecast_df = window_df[in_horizon]
+        print(f"Forecast period: {forecast_start.date()} to {max_date.date()}")
+        results_df = generate_forecast(model, forecast_df, horizon,
+                                       predictions=window_predictions[in_horizon])
         
         # Save forecast
         filepath = save_forecast(results_df, horizon, OUTPUT_DIR)
@@ -7,62 +7,76 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(__file__))
 
-from demand_forecasting_model import DemandForecastingModel
+from demand_forecasting_model import DemandForecastingModel, find_model_file, read_recent_feature_data, regression_metrics
 import pandas as pd
 
 
-def test_inference():
-    """Test the inference pipeline with all horizons."""
+def test_inference(model: DemandForecastingModel = None, df: pd.DataFrame = None,
+                   model_dir: str = "saved_models"):
+    """
+    Test the inference pipeline with all horizons.
+    
+    The model is loaded from the saved artifacts by default, so the test
+    covers save_model/load_model as well as prediction.
+    
+    Args:
+        model: Already trained or loaded model to test instead of loading one
+            (skips the saved artifacts)
+        df: Already loaded feature data; read from disk if omitted
+        model_dir: Directory holding the saved model artifacts
+    """
     print("="*70)
     print("TESTING PRODUCTION INFERENCE PIPELINE")
     print("="*70)
     
     DATA_PATH = r"C:\Users\kingd\Ennovar\data\xg_df.csv"
-    MODEL_DIR = "saved_models"
-    
-    # Check if model exists
-    if not os.path.exists(os.path.join(MODEL_DIR, "xgboost_model.json")):
-        print(f"\nError: No trained model found in '{MODEL_DIR}/'")
-        return False
     
-    # Load model
-    print("\n[1/2] Loading trained model...")
-    model = DemandForecastingModel()
-    model.load_model(MODEL_DIR)
+    if model is None:
+        # Check if model exists
+        if find_model_file(model_dir) is None:
+            print(f"\nError: No trained model found in '{model_dir}/'")
+            return False
+        
+        # Load model
+        print("\n[1/2] Loading trained model...")
+        model = DemandForecastingModel()
+        model.load_model(model_dir)
     
     # Load data
     print("\n[2/2] Testing inference on all horizons...")
-    df = pd.read_csv(DATA_PATH)
-    df['Date'] = pd.to_datetime(df['Date'])
-    
     horizons = [7, 14, 30]
     results = []
     
+    # Predict once over the longest horizon; every shorter horizon is the
+    # most recent part of that window, so only that window is read
+    if df is None:
+        window_df = read_recent_feature_data(DATA_PATH, max(horizons))
+        max_date = window_df['Date'].max()
+    else:
+        max_date = df['Date'].max()
+        window_df = df[df['Date'] >= max_date - pd.Timedelta(days=max(horizons) - 1)]
+    window_predictions = model.predict(window_df)
+    
     for horizon in horizons:
         print(f"\n{'='*70}")
         print(f"Testing {horizon}-day forecast...")
         print(f"{'='*70}")
         
-        # Get data for this horizon
-        max_date = df['Date'].max()
+        # Slice this horizon's rows and predictions out of the batch
         forecast_start = max_date - pd.Timedelta(days=horizon - 1)
-        forecast_df = df[df['Date'] >= forecast_start].copy()
+        in_horizon = (window_df['Date'] >= forecast_start).to_numpy()
+        forecast_df = window_df[in_horizon]
         
         print(f"  Forecast period: {forecast_start.date()} to {max_date.date()}")
         print(f"  Data points: {len(forecast_df):,}")
         
-        # Make predictions
-        predictions = model.predict(forecast_df)
+        predictions = window_predictions[in_horizon]
         
         # Calculate metrics
         if 'quantity' in forecast_df.columns:
-            from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-            import numpy as np
-            
             actuals = forecast_df['quantity'].values
-            mae = mean_absolute_error(actuals, predictions)
-            rmse = np.sqrt(mean_squared_error(actuals, predictions))
-            r2 = r2_score(actuals, predictions)
+            metrics = regression_metrics(actuals, predictions)
+            mae, rmse, r2 = metrics['mae'], metrics['rmse'], metrics['r2']
             
             print(f"\n  Performance:")
             print(f"    MAE:  {mae:.4f}")
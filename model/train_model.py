@@ -5,7 +5,8 @@ This script trains the XGBoost demand forecasting model on historical data
 and saves the trained model artifacts for production use.
 
 Usage:
-    python train_model.py
+    python train_model.py              # train, save, then run the inference test
+    python train_model.py --skip-test  # train and save only
 """
 
 import sys
@@ -23,6 +24,9 @@ def train_and_save_model(data_path: str, model_dir: str = "saved_models",
         model_dir: Directory to save model artifacts
         test_days: Number of days for test set (default: 30 days for comprehensive testing)
         val_days: Number of days for validation set
+        
+    Returns:
+        Tuple of (trained model, metrics per split, loaded data)
     """
     print("="*70)
     print("DEMAND FORECASTING MODEL - TRAINING PHASE")
@@ -84,7 +88,7 @@ def train_and_save_model(data_path: str, model_dir: str = "saved_models",
         'train': train_results,
         'validation': val_results,
         'test': test_results
-    }
+    }, df
 
 
 if __name__ == "__main__":
@@ -94,13 +98,21 @@ if __name__ == "__main__":
     
     # Train and save model
     try:
-        model, results = train_and_save_model(
+        model, results, df = train_and_save_model(
             data_path=DATA_PATH,
             model_dir=MODEL_DIR,
             test_days=30,  # Use 30 days for comprehensive testing
             val_days=14
         )
         
+        # Run the inference test in this process on the data already in
+        # memory, with the model reloaded from the saved artifacts so a
+        # broken save or load fails the test
+        if '--skip-test' not in sys.argv[1:]:
+            from test_inference import test_inference
+            if not test_inference(df=df, model_dir=MODEL_DIR):
+                sys.exit(1)
+        
         print("\nTraining script completed successfully!")
         
     except Exception as e:
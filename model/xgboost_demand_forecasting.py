@@ -2,13 +2,19 @@ import numpy as np
 import pandas as pd
 import xgboost as xgb
 from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from typing import List, Dict, Tuple
 import warnings
 import os
-import re
+from demand_forecasting_model import (
+    CSV_NULL_VALUES, HAS_GPU, MAX_BIN, fill_missing, price_tier_promo_codes, regression_metrics,
+    sanitize_feature_name, to_dmatrix, write_frame_csv
+)
 warnings.filterwarnings('ignore')
 
+# Bump when engineer_features changes, so cached engineered frames from the
+# previous code are not reused
+FEATURE_CACHE_VERSION = 3
+
 
 class XGBoostDemandForecasting:
     """Simplified XGBoost-only demand forecasting model."""
@@ -26,6 +32,8 @@ class XGBoostDemandForecasting:
         self.target_col = 'quantity'
         self.target_transformer = None
         self.label_encoders = {}
+        # (X_train, dtrain, X_val, dval) from the last train_xgboost call
+        self._train_matrices = (None, None, None, None)
         
     def load_data(self) -> pd.DataFrame:
         """
@@ -35,16 +43,102 @@ class XGBoostDemandForecasting:
             Loaded dataframe
         """
         print(f"Loading data from {self.data_path}")
-        df = pd.read_csv(self.data_path)
-        
-        # Convert Date to datetime
-        if 'Date' in df.columns:
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pacsv
+        except ImportError:
+            df = pd.read_csv(self.data_path)
+        else:
+            # Multithreaded parse with Date typed as a timestamp up front
+            table = pacsv.read_csv(
+                self.data_path,
+                read_options=pacsv.ReadOptions(use_threads=True),
+                convert_options=pacsv.ConvertOptions(
+                    column_types={'Date': pa.timestamp('ns')},
+                    null_values=CSV_NULL_VALUES,
+                    strings_can_be_null=True
+                )
+            )
+            df = table.to_pandas(split_blocks=True, self_destruct=True)
+            del table
+            # Keep pandas' name for an unnamed index column
+            if '' in df.columns:
+                df = df.rename(columns={'': 'Unnamed: 0'})
+        
+        # Convert Date to datetime (skipped when the reader already parsed it)
+        if 'Date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['Date']):
             df['Date'] = pd.to_datetime(df['Date'])
         
         print(f"Loaded dataset shape: {df.shape}")
         print(f"Columns: {list(df.columns)}")
         return df
     
+    def _interaction_feature_block(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Compute interaction features between important variables as arrays."""
+        cols = df.columns
+        out = {}
+        
+        # Price and promotion interactions
+        if 'promo_flag' in cols:
+            promo = df['promo_flag'].to_numpy()
+            if 'unit_price' in cols:
+                out['price_promo_interaction'] = df['unit_price'].to_numpy() * promo
+            
+            if 'discount_pct' in cols:
+                out['discount_intensity'] = df['discount_pct'].to_numpy() * promo
+            
+            # Seasonal interactions
+            if 'is_weekend' in cols:
+                out['weekend_promo'] = df['is_weekend'].to_numpy() * promo
+            
+            if 'month' in cols:
+                out['month_promo'] = df['month'].to_numpy() * promo
+        
+        # Rolling mean interactions
+        if 'rolling_mean_28' in cols and 'sales_lag_1' in cols:
+            out['current_vs_avg'] = df['sales_lag_1'].to_numpy() / (df['rolling_mean_28'].to_numpy() + 1e-10)
+        
+        # Price tier interactions
+        if 'price_tier' in cols and 'promo_flag' in cols:
+            out['price_tier_promo'] = price_tier_promo_codes(df)
+        
+        return out
+    
+    def _advanced_feature_block(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Compute advanced statistical and domain-specific features as arrays."""
+        cols = df.columns
+        out = {}
+        
+        # Coefficient of variation (volatility measure)
+        if 'rolling_mean_28' in cols and 'rolling_std_28' in cols:
+            out['cv_28'] = df['rolling_std_28'].to_numpy() / (df['rolling_mean_28'].to_numpy() + 1e-10)
+        
+        # Momentum features
+        if 'sales_lag_7' in cols and 'sales_lag_14' in cols:
+            lag_14 = df['sales_lag_14'].to_numpy()
+            out['momentum_7_14'] = (df['sales_lag_7'].to_numpy() - lag_14) / (lag_14 + 1e-10)
+        
+        # Inventory turnover proxy
+        if 'sales_lag_7' in cols and 'rolling_mean_28' in cols:
+            out['turnover_proxy'] = df['sales_lag_7'].to_numpy() / (df['rolling_mean_28'].to_numpy() + 1e-10)
+        
+        # Price elasticity proxy
+        if 'price_change_7' in cols and 'pct_change_7' in cols:
+            out['price_elasticity_proxy'] = df['pct_change_7'].to_numpy() / (df['price_change_7'].to_numpy() + 1e-10)
+        
+        # Seasonal decomposition features
+        if 'month' in cols:
+            angle = 2 * np.pi * df['month'].to_numpy() / 12
+            out['month_sin'] = np.sin(angle)
+            out['month_cos'] = np.cos(angle)
+        
+        if 'day_of_week' in cols:
+            angle = 2 * np.pi * df['day_of_week'].to_numpy() / 7
+            out['day_sin'] = np.sin(angle)
+            out['day_cos'] = np.cos(angle)
+        
+        return out
+    
     def create_interaction_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Create interaction features between important variables.
@@ -55,31 +149,7 @@ class XGBoostDemandForecasting:
         Returns:
             Dataframe with interaction features
         """
-        df = df.copy()
-        
-        # Price and promotion interactions
-        if 'unit_price' in df.columns and 'promo_flag' in df.columns:
-            df['price_promo_interaction'] = df['unit_price'] * df['promo_flag']
-        
-        if 'discount_pct' in df.columns and 'promo_flag' in df.columns:
-            df['discount_intensity'] = df['discount_pct'] * df['promo_flag']
-        
-        # Seasonal interactions
-        if 'is_weekend' in df.columns and 'promo_flag' in df.columns:
-            df['weekend_promo'] = df['is_weekend'] * df['promo_flag']
-        
-        if 'month' in df.columns and 'promo_flag' in df.columns:
-            df['month_promo'] = df['month'] * df['promo_flag']
-        
-        # Rolling mean interactions
-        if 'rolling_mean_28' in df.columns and 'sales_lag_1' in df.columns:
-            df['current_vs_avg'] = df['sales_lag_1'] / (df['rolling_mean_28'] + 1e-10)
-        
-        # Price tier interactions
-        if 'price_tier' in df.columns and 'promo_flag' in df.columns:
-            df['price_tier_promo'] = df.groupby(['price_tier', 'promo_flag']).ngroup()
-        
-        return df
+        return df.assign(**self._interaction_feature_block(df))
     
     def create_advanced_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -91,34 +161,22 @@ class XGBoostDemandForecasting:
         Returns:
             Dataframe with advanced features
         """
-        df = df.copy()
-        
-        # Coefficient of variation (volatility measure)
-        if 'rolling_mean_28' in df.columns and 'rolling_std_28' in df.columns:
-            df['cv_28'] = df['rolling_std_28'] / (df['rolling_mean_28'] + 1e-10)
-        
-        # Momentum features
-        if 'sales_lag_7' in df.columns and 'sales_lag_14' in df.columns:
-            df['momentum_7_14'] = (df['sales_lag_7'] - df['sales_lag_14']) / (df['sales_lag_14'] + 1e-10)
-        
-        # Inventory turnover proxy
-        if 'sales_lag_7' in df.columns and 'rolling_mean_28' in df.columns:
-            df['turnover_proxy'] = df['sales_lag_7'] / (df['rolling_mean_28'] + 1e-10)
-        
-        # Price elasticity proxy
-        if 'price_change_7' in df.columns and 'pct_change_7' in df.columns:
-            df['price_elasticity_proxy'] = df['pct_change_7'] / (df['price_change_7'] + 1e-10)
-        
-        # Seasonal decomposition features
-        if 'month' in df.columns:
-            df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
-            df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
-        
-        if 'day_of_week' in df.columns:
-            df['day_sin'] = np.sin(2 * np.pi * df['day_of_week'] / 7)
-            df['day_cos'] = np.cos(2 * np.pi * df['day_of_week'] / 7)
+        return df.assign(**self._advanced_feature_block(df))
+    
+    def create_derived_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Create the interaction and advanced features in one pass: every
+        derived column is computed on NumPy arrays and attached with a single
+        assign, instead of one frame copy per feature group and one block
+        insert per column.
         
-        return df
+        Args:
+            df: Input dataframe
+            
+        Returns:
+            Dataframe with interaction and advanced features
+        """
+        return df.assign(**self._interaction_feature_block(df), **self._advanced_feature_block(df))
     
     def encode_categorical_features(self, train_df: pd.DataFrame, 
                                    val_df: pd.DataFrame, 
@@ -144,16 +202,18 @@ class XGBoostDemandForecasting:
             if col in train_encoded.columns:
                 le = LabelEncoder()
                 
-                # Fit on train data
-                train_encoded[col] = le.fit_transform(train_encoded[col].astype(str))
+                # Fit on train data with one hash-based factorize; sorting
+                # only the uniques gives the same classes_ and codes as
+                # LabelEncoder.fit_transform
+                codes, uniques = pd.factorize(train_encoded[col].astype(str), sort=True)
+                le.classes_ = np.asarray(uniques, dtype=object)
+                train_encoded[col] = codes.astype(np.int32)
                 
-                # Transform validation and test
-                val_encoded[col] = val_encoded[col].astype(str).apply(
-                    lambda x: le.transform([x])[0] if x in le.classes_ else -1
-                )
-                test_encoded[col] = test_encoded[col].astype(str).apply(
-                    lambda x: le.transform([x])[0] if x in le.classes_ else -1
-                )
+                # Transform validation and test with one vectorized lookup
+                # against the fitted classes (unseen values become -1)
+                classes = pd.Index(le.classes_)
+                val_encoded[col] = classes.get_indexer(val_encoded[col].astype(str)).astype(np.int32)
+                test_encoded[col] = classes.get_indexer(test_encoded[col].astype(str)).astype(np.int32)
                 
                 self.label_encoders[col] = le
                 print(f"    Encoded {col}: {len(le.classes_)} unique values")
@@ -171,15 +231,13 @@ class XGBoostDemandForecasting:
         Returns:
             Transformed targets and the transformer object
         """
-        # Use log1p transformation for count data
-        transformer = lambda x: np.log1p(x)
-        inverse_transformer = lambda x: np.expm1(x)
-        
-        y_train_transformed = transformer(y_train)
-        y_val_transformed = transformer(y_val)
-        y_test_transformed = transformer(y_test)
+        # Use log1p transformation for count data (inverted with expm1)
+        y_train_transformed = np.log1p(y_train)
+        y_val_transformed = np.log1p(y_val)
+        y_test_transformed = np.log1p(y_test)
         
-        self.target_transformer = {'transform': transformer, 'inverse': inverse_transformer}
+        # Store transformation info (not the functions themselves for pickling)
+        self.target_transformer = {'method': 'log1p'}
         
         return y_train_transformed, y_val_transformed, y_test_transformed, self.target_transformer
     
@@ -215,10 +273,21 @@ class XGBoostDemandForecasting:
         print(f"  Validation: {val_start.date()} to {(test_start - pd.Timedelta(days=1)).date()}")
         print(f"  Test: {test_start.date()} to {max_date.date()}")
         
-        # Create splits
-        train_df = df[df['Date'] < val_start].copy()
-        val_df = df[(df['Date'] >= val_start) & (df['Date'] < test_start)].copy()
-        test_df = df[df['Date'] >= test_start].copy()
+        # Create splits. On date-ordered data the cutoffs are two binary
+        # searches and the splits are slices; other row orders keep the
+        # masks so rows stay in their input order. The splits are only read
+        # downstream (encoding works on its own copies), so no copies here
+        dates = df['Date']
+        if dates.is_monotonic_increasing:
+            i_val = dates.searchsorted(val_start, side='left')
+            i_test = dates.searchsorted(test_start, side='left')
+            train_df = df.iloc[:i_val]
+            val_df = df.iloc[i_val:i_test]
+            test_df = df.iloc[i_test:]
+        else:
+            train_df = df[dates < val_start]
+            val_df = df[(dates >= val_start) & (dates < test_start)]
+            test_df = df[dates >= test_start]
         
         print(f"\nDataset sizes:")
         print(f"  Train: {len(train_df):,} rows ({len(train_df)/len(df)*100:.1f}%)")
@@ -233,8 +302,57 @@ class XGBoostDemandForecasting:
         
         return train_df, val_df, test_df
     
+    def engineer_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the derived features and replace infinite and missing values.
+        
+        Args:
+            df: Input dataframe
+            
+        Returns:
+            Dataframe with derived features and no inf/NaN values
+        """
+        print("Creating interaction and advanced features...")
+        df = self.create_derived_features(df)
+        
+        # Handle any infinite values and fill NaN values
+        # (df is a fresh frame from assign, so it is filled in place)
+        return fill_missing(df)
+    
+    def load_engineered_data(self) -> pd.DataFrame:
+        """
+        Load the data with engineer_features applied.
+        
+        The engineered frame is cached as Parquet next to the CSV and reused
+        while it is newer than the CSV and was written by the current
+        FEATURE_CACHE_VERSION, so re-runs skip CSV parsing and feature
+        engineering.
+        
+        Returns:
+            Engineered dataframe
+        """
+        cache_path = f"{os.path.splitext(self.data_path)[0]}.features.v{FEATURE_CACHE_VERSION}.parquet"
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(self.data_path):
+            try:
+                df = pd.read_parquet(cache_path)
+            except (ImportError, OSError, ValueError) as e:
+                print(f"Could not read {cache_path}, rebuilding features: {e}")
+            else:
+                print(f"Loaded engineered features from {cache_path}")
+                print(f"Loaded dataset shape: {df.shape}")
+                return df
+        
+        df = self.engineer_features(self.load_data())
+        try:
+            df.to_parquet(cache_path, compression='zstd', index=False)
+        except (ImportError, OSError, TypeError, ValueError) as e:
+            print(f"Could not write feature cache {cache_path}: {e}")
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+        return df
+    
     def prepare_model_data(self, train_df: pd.DataFrame, val_df: pd.DataFrame, 
-                          test_df: pd.DataFrame) -> Tuple:
+                          test_df: pd.DataFrame, engineered: bool = False) -> Tuple:
         """
         Prepare data for model training.
         
@@ -242,6 +360,8 @@ class XGBoostDemandForecasting:
             train_df: Training dataframe
             val_df: Validation dataframe
             test_df: Test dataframe
+            engineered: Whether the splits come from a frame that already went
+                through engineer_features (skips feature creation per split)
             
         Returns:
             Tuple of X_train, y_train, X_val, y_val, X_test, y_test
@@ -249,25 +369,10 @@ class XGBoostDemandForecasting:
         print("\nPreparing model data...")
         
         # Add additional features
-        print("Creating interaction features...")
-        train_df = self.create_interaction_features(train_df)
-        val_df = self.create_interaction_features(val_df)
-        test_df = self.create_interaction_features(test_df)
-        
-        print("Creating advanced features...")
-        train_df = self.create_advanced_features(train_df)
-        val_df = self.create_advanced_features(val_df)
-        test_df = self.create_advanced_features(test_df)
-        
-        # Handle any infinite values
-        train_df = train_df.replace([np.inf, -np.inf], np.nan)
-        val_df = val_df.replace([np.inf, -np.inf], np.nan)
-        test_df = test_df.replace([np.inf, -np.inf], np.nan)
-        
-        # Fill NaN values
-        train_df = train_df.fillna(0)
-        val_df = val_df.fillna(0)
-        test_df = test_df.fillna(0)
+        if not engineered:
+            train_df = self.engineer_features(train_df)
+            val_df = self.engineer_features(val_df)
+            test_df = self.engineer_features(test_df)
         
         # Encode categorical features
         print("Encoding categorical features...")
@@ -279,12 +384,8 @@ class XGBoostDemandForecasting:
         exclude_cols = ['sku_id', 'Date', self.target_col]
         self.feature_cols = [col for col in train_encoded.columns if col not in exclude_cols]
         
-        # Sanitize feature names for XGBoost compatibility
-        def sanitize_feature_name(name):
-            # Replace special JSON characters with underscores
-            return re.sub(r'[^\w\-]', '_', str(name))
-        
-        # Create mapping of old to new names
+        # Sanitize feature names for XGBoost compatibility: create mapping
+        # of old to new names (special JSON characters become underscores)
         feature_name_mapping = {col: sanitize_feature_name(col) for col in self.feature_cols}
         
         # Rename columns in all datasets
@@ -293,19 +394,21 @@ class XGBoostDemandForecasting:
         test_encoded = test_encoded.rename(columns=feature_name_mapping)
         
         # Update feature_cols with sanitized names
-        self.feature_cols = [sanitize_feature_name(col) for col in self.feature_cols]
+        self.feature_cols = [feature_name_mapping[col] for col in self.feature_cols]
         
         print(f"Number of features: {len(self.feature_cols)}")
         
-        # Prepare X and y
-        X_train = train_encoded[self.feature_cols].copy()
-        y_train = train_encoded[self.target_col].copy()
+        # Prepare X and y. Features are float32, the type XGBoost converts
+        # everything to internally (category codes are small integers and
+        # stay exact); astype already returns new frames, so no extra copy
+        X_train = train_encoded[self.feature_cols].astype(np.float32)
+        y_train = train_encoded[self.target_col]
         
-        X_val = val_encoded[self.feature_cols].copy()
-        y_val = val_encoded[self.target_col].copy()
+        X_val = val_encoded[self.feature_cols].astype(np.float32)
+        y_val = val_encoded[self.target_col]
         
-        X_test = test_encoded[self.feature_cols].copy()
-        y_test = test_encoded[self.target_col].copy()
+        X_test = test_encoded[self.feature_cols].astype(np.float32)
+        y_test = test_encoded[self.target_col]
         
         # Apply target transformation
         print("Applying target transformation...")
@@ -345,15 +448,21 @@ class XGBoostDemandForecasting:
             'reg_alpha': 1.0,
             'reg_lambda': 5.0,
             'random_state': 42,
-            'n_jobs': -1
+            'n_jobs': -1,
+            'tree_method': 'hist',
+            'max_bin': MAX_BIN
         }
+        if HAS_GPU:
+            params['device'] = 'cuda'
         
         print("XGBoost Configuration:")
         for key, value in params.items():
             print(f"  {key}: {value}")
         
-        dtrain = xgb.DMatrix(X_train, label=y_train)
-        dval = xgb.DMatrix(X_val, label=y_val)
+        # Features are quantized once into histogram bins shared by both
+        # matrices; the validation matrix reuses the training bin edges
+        dtrain = to_dmatrix(X_train, label=y_train, quantile=True)
+        dval = to_dmatrix(X_val, label=y_val, quantile=True, ref=dtrain)
         
         evals = [(dtrain, 'train'), (dval, 'validation')]
         
@@ -366,11 +475,15 @@ class XGBoostDemandForecasting:
             verbose_eval=100
         )
         
+        # Kept so evaluate() predicts on these matrices instead of rebuilding them
+        self._train_matrices = (X_train, dtrain, X_val, dval)
+        
         return self.model
     
     def evaluate(self, X_train: pd.DataFrame, y_train: pd.Series,
                 X_val: pd.DataFrame, y_val: pd.Series,
-                X_test: pd.DataFrame, y_test: pd.Series) -> Dict:
+                X_test: pd.DataFrame, y_test: pd.Series,
+                compute_train_metrics: bool = False) -> Dict:
         """
         Evaluate model performance.
         
@@ -378,45 +491,42 @@ class XGBoostDemandForecasting:
             X_train, y_train: Training data (transformed)
             X_val, y_val: Validation data (transformed)
             X_test, y_test: Test data (transformed)
+            compute_train_metrics: Whether to also predict the (largest)
+                training split; its metrics, predictions and true values
+                are None otherwise
             
         Returns:
             Dictionary containing metrics and predictions
         """
         print("\nEvaluating model performance...")
         
-        # Make predictions
-        dmatrix_train = xgb.DMatrix(X_train)
-        dmatrix_val = xgb.DMatrix(X_val)
-        dmatrix_test = xgb.DMatrix(X_test)
-        
-        y_train_pred_transformed = self.model.predict(dmatrix_train)
-        y_val_pred_transformed = self.model.predict(dmatrix_val)
-        y_test_pred_transformed = self.model.predict(dmatrix_test)
-        
-        # Transform back to original space
-        if self.target_transformer:
-            y_train_pred = np.maximum(self.target_transformer['inverse'](y_train_pred_transformed), 0)
-            y_val_pred = np.maximum(self.target_transformer['inverse'](y_val_pred_transformed), 0)
-            y_test_pred = np.maximum(self.target_transformer['inverse'](y_test_pred_transformed), 0)
-            
-            y_train_true = self.target_transformer['inverse'](y_train)
-            y_val_true = self.target_transformer['inverse'](y_val)
-            y_test_true = self.target_transformer['inverse'](y_test)
+        # Make predictions, reusing the matrices train_xgboost built when
+        # called with the same training and validation features
+        trained_X_train, dmatrix_train, trained_X_val, dmatrix_val = self._train_matrices
+        if compute_train_metrics and trained_X_train is not X_train:
+            dmatrix_train = to_dmatrix(X_train)
+        if trained_X_val is not X_val:
+            dmatrix_val = to_dmatrix(X_val)
+        dmatrix_test = to_dmatrix(X_test)
+        
+        def predict_split(dmatrix, y):
+            """Predictions and true values, transformed back to original space."""
+            y_pred_transformed = self.model.predict(dmatrix)
+            if self.target_transformer:
+                return np.maximum(np.expm1(y_pred_transformed), 0), np.expm1(y)
+            return np.maximum(y_pred_transformed, 0), y
+        
+        if compute_train_metrics:
+            y_train_pred, y_train_true = predict_split(dmatrix_train, y_train)
         else:
-            y_train_pred = np.maximum(y_train_pred_transformed, 0)
-            y_val_pred = np.maximum(y_val_pred_transformed, 0)
-            y_test_pred = np.maximum(y_test_pred_transformed, 0)
-            
-            y_train_true = y_train
-            y_val_true = y_val
-            y_test_true = y_test
+            y_train_pred = y_train_true = None
+        y_val_pred, y_val_true = predict_split(dmatrix_val, y_val)
+        y_test_pred, y_test_true = predict_split(dmatrix_test, y_test)
         
         def calculate_metrics(y_true, y_pred, dataset_name):
             """Calculate regression metrics."""
-            mae = mean_absolute_error(y_true, y_pred)
-            rmse = np.sqrt(mean_squared_error(y_true, y_pred))
-            r2 = r2_score(y_true, y_pred)
-            mape = np.mean(np.abs((y_true - y_pred) / (y_true + 1e-10))) * 100
+            metrics = regression_metrics(y_true, y_pred)
+            mae, rmse, r2, mape = metrics['mae'], metrics['rmse'], metrics['r2'], metrics['mape']
             
             print(f"\n{dataset_name} Metrics:")
             print(f"  MAE:  {mae:.4f}")
@@ -428,7 +538,7 @@ class XGBoostDemandForecasting:
         
         print("XGBOOST MODEL PERFORMANCE EVALUATION")
         
-        train_metrics = calculate_metrics(y_train_true, y_train_pred, "TRAIN")
+        train_metrics = calculate_metrics(y_train_true, y_train_pred, "TRAIN") if compute_train_metrics else None
         val_metrics = calculate_metrics(y_val_true, y_val_pred, "VALIDATION")
         test_metrics = calculate_metrics(y_test_true, y_test_pred, "TEST")
         
@@ -473,10 +583,7 @@ class XGBoostDemandForecasting:
         results_df = results_df[['product_type', 'forecast_horizon', 'Date', 'actual_quantity', 'predicted_quantity']]
         
         # Save to CSV (append mode for multiple horizons)
-        if not os.path.exists(output_file):
-            results_df.to_csv(output_file, index=False)
-        else:
-            results_df.to_csv(output_file, index=False, mode='a', header=False)
+        write_frame_csv(results_df, output_file, append=True)
         
         print(f"Saved {len(results_df)} XGBoost predictions for {forecast_horizon}-day horizon")
     
@@ -492,14 +599,16 @@ class XGBoostDemandForecasting:
         
         metrics_data = []
         for horizon, metrics in all_metrics.items():
-            metrics_data.append({
-                'forecast_horizon': horizon,
-                'dataset': 'train',
-                'mae': metrics['train']['mae'],
-                'rmse': metrics['train']['rmse'],
-                'r2': metrics['train']['r2'],
-                'mape': metrics['train']['mape']
-            })
+            # Train metrics are only present when they were computed
+            if metrics['train'] is not None:
+                metrics_data.append({
+                    'forecast_horizon': horizon,
+                    'dataset': 'train',
+                    'mae': metrics['train']['mae'],
+                    'rmse': metrics['train']['rmse'],
+                    'r2': metrics['train']['r2'],
+                    'mape': metrics['train']['mape']
+                })
             metrics_data.append({
                 'forecast_horizon': horizon,
                 'dataset': 'validation',
@@ -523,7 +632,8 @@ class XGBoostDemandForecasting:
     
     def run_pipeline(self, forecast_horizons: List[int] = [7, 14, 30], val_days: int = 14,
                     predictions_output: str = 'xgboost_predictions.csv',
-                    metrics_output: str = 'xgboost_metrics.csv') -> Dict:
+                    metrics_output: str = 'xgboost_metrics.csv',
+                    compute_train_metrics: bool = False) -> Dict:
         """
         Run the complete XGBoost demand forecasting pipeline for multiple forecast horizons.
         
@@ -532,6 +642,8 @@ class XGBoostDemandForecasting:
             val_days: Number of days for validation set
             predictions_output: Output file for predictions CSV
             metrics_output: Output file for metrics CSV
+            compute_train_metrics: Whether to also evaluate each training split
+                (for overfitting diagnostics)
             
         Returns:
             Dictionary containing model results and metrics for all horizons
@@ -539,8 +651,9 @@ class XGBoostDemandForecasting:
         print("XGBOOST DEMAND FORECASTING PIPELINE - MULTIPLE HORIZONS")
         print(f"Forecast horizons: {forecast_horizons} days")
         
-        # Load data once
-        df = self.load_data()
+        # Load data and engineer features once; every horizon's splits are
+        # slices of this frame
+        df = self.load_engineered_data()
         
         # Remove existing output files to start fresh
         if os.path.exists(predictions_output):
@@ -560,14 +673,15 @@ class XGBoostDemandForecasting:
             
             # Prepare model data
             X_train, y_train, X_val, y_val, X_test, y_test = self.prepare_model_data(
-                train_df, val_df, test_df
+                train_df, val_df, test_df, engineered=True
             )
             
             # Train XGBoost model for this horizon
             self.train_xgboost(X_train, y_train, X_val, y_val)
             
             # Evaluate model
-            results = self.evaluate(X_train, y_train, X_val, y_val, X_test, y_test)
+            results = self.evaluate(X_train, y_train, X_val, y_val, X_test, y_test,
+                                    compute_train_metrics=compute_train_metrics)
             
             # Save predictions to CSV
             self.save_predictions_to_csv(
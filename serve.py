@@ -0,0 +1,14 @@
+"""
+Production entry point for the backend API.
+
+Serves the Flask app under waitress with a thread pool instead of the
+single-threaded Werkzeug dev server. The frontend is not started.
+
+Usage:
+    python serve.py
+"""
+from app import run_production_server
+
+if __name__ == '__main__':
+    print("Starting backend server...")
+    run_production_server()
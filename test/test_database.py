@@ -0,0 +1,119 @@
+import os
+import sqlite3
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from backend.utils import database
+
+
+def build_database(path, categories):
+    """(Re)create a database file holding dim_category and an empty daily_sales"""
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE dim_category (category_name TEXT PRIMARY KEY)")
+    conn.executemany("INSERT INTO dim_category VALUES (?)", [(c,) for c in categories])
+    conn.execute("CREATE TABLE daily_sales (category TEXT, product_name TEXT, date_key INTEGER, "
+                 "sale_date TEXT, total_sales REAL, total_quantity INTEGER)")
+    conn.execute("INSERT INTO daily_sales VALUES ('Beauty', 'Lip Balm', 20230105, '2023-01-05', 9.5, 2)")
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "database.db")
+    monkeypatch.setattr(database, "DB_PATH", path)
+    monkeypatch.setattr(database, "DB_URI", Path(path).as_uri() + "?mode=ro")
+    database.invalidate_metadata_cache()
+    yield path
+    database.close_connections()
+    database.invalidate_metadata_cache()
+
+
+def test_rebuilt_database_is_reread(db_path):
+    build_database(db_path, ["Beauty"])
+    version = database.db_version()
+    conn = database.get_connection()
+    assert database.get_categories() == [{"category_name": "Beauty"}]
+
+    build_database(db_path, ["Feminine", "Haircare"])
+    # Inode numbers may be reused by the new file, so make the mtime differ too
+    stat = os.stat(db_path)
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert database.db_version() != version
+    assert database.get_connection() is not conn
+    assert database.get_categories() == [
+        {"category_name": "Feminine"},
+        {"category_name": "Haircare"},
+    ]
+
+
+def test_unchanged_database_reuses_connection_and_cache(db_path):
+    build_database(db_path, ["Beauty"])
+    conn = database.get_connection()
+    first = database.get_categories()
+    assert database.get_connection() is conn
+    assert database.get_categories() == first
+    assert database._cached_column.cache_info().hits >= 1
+
+
+def test_missing_database_is_not_created(db_path):
+    assert database.db_version() is None
+    assert database.get_categories() == []
+    assert not os.path.exists(db_path)
+
+
+
+def test_failed_query_is_not_cached(db_path, monkeypatch):
+    build_database(db_path, ["Beauty"])
+    version = database.db_version()
+
+    def locked():
+        raise sqlite3.OperationalError("database is locked")
+
+    with monkeypatch.context() as m:
+        m.setattr(database, "get_connection", locked)
+        assert database.get_categories() == []
+        assert database.get_year_range() == {}
+
+    # Same database version: the failure must not have been remembered
+    assert database.db_version() == version
+    assert database.get_categories() == [{"category_name": "Beauty"}]
+
+
+def test_failed_sales_pattern_is_not_cached(db_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    build_database(db_path, ["Beauty"])
+    monkeypatch.setattr(database, "adbc_sqlite", None)
+    args = ("Beauty", "Lip Balm", "2023-01-01", "2023-01-31")
+
+    def locked():
+        raise sqlite3.OperationalError("database is locked")
+
+    with monkeypatch.context() as m:
+        m.setattr(database, "get_connection", locked)
+        assert database.get_sales_pattern_by_date(*args).num_rows == 0
+
+    assert database.get_sales_pattern_by_date(*args).to_pylist() == [
+        {"sale_date": "2023-01-05", "total_sales": 9.5, "total_quantity": 2}
+    ]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2023-01-05", 20230105),
+    ("2023-01-05 13:45:00", 20230105),
+    (date(2023, 1, 5), 20230105),
+    (datetime(2023, 1, 5, 13, 45), 20230105),
+    ("2023-1-5", None),
+    ("2023-13-01", None),
+    ("", None),
+    (None, None),
+])
+def test_date_key(value, expected):
+    assert database.date_key(value) == expected
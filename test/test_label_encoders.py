@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("xgboost")
+pytest.importorskip("sklearn")
+
+from demand_forecasting_model import DemandForecastingModel, fill_missing
+
+
+def fitted_model():
+    model = DemandForecastingModel()
+    model._fit_label_encoder("category", pd.Series(["Haircare", "Beauty", "Beauty"]))
+    tiers = fill_missing(pd.DataFrame({"price_tier": ["mid", None, "low"]}))["price_tier"]
+    model._fit_label_encoder("price_tier", tiers)
+    return model
+
+
+def test_label_encoders_round_trip(tmp_path):
+    model = fitted_model()
+    model._save_label_encoders(str(tmp_path))
+
+    loaded = DemandForecastingModel()
+    loaded._load_label_encoders(str(tmp_path))
+
+    assert loaded.label_encoders.keys() == model.label_encoders.keys()
+    for col, le in model.label_encoders.items():
+        assert list(loaded.label_encoders[col].classes_) == list(le.classes_)
+
+    values = pd.Series(["mid", "0", "low", "premium"])
+    np.testing.assert_array_equal(
+        loaded._apply_label_map(values, "price_tier").to_numpy(),
+        model._apply_label_map(values, "price_tier").to_numpy(),
+    )
+    # Unseen values map to -1 after reloading as well
+    assert loaded._apply_label_map(values, "price_tier").iloc[-1] == -1
+
+
+def test_missing_tier_codes_match_encoded_column():
+    model = fitted_model()
+    df = pd.DataFrame({"price_tier": ["mid", None, "low"], "promo_flag": [1, 0, 1]})
+
+    codes = model._price_tier_promo_codes(df)
+
+    encoded = model._apply_label_map(fill_missing(df[["price_tier"]].copy())["price_tier"],
+                                     "price_tier").to_numpy()
+    np.testing.assert_array_equal(codes, encoded * 2 + df["promo_flag"].to_numpy())
@@ -0,0 +1,48 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("orjson")
+
+import orjson
+from flask import Flask
+
+from backend.routes import products
+from backend.utils import database
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    path = tmp_path / "database.db"
+    monkeypatch.setattr(database, "DB_PATH", str(path))
+    monkeypatch.setattr(database, "DB_URI", path.as_uri() + "?mode=ro")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE dim_category (category_name TEXT PRIMARY KEY)")
+    conn.execute("INSERT INTO dim_category VALUES ('Beauty')")
+    conn.commit()
+    conn.close()
+    for cached in (products._cached_categories_json, products._cached_products_json,
+                   products._cached_products_by_category_json):
+        cached.cache_clear()
+    database.invalidate_metadata_cache()
+
+    app = Flask(__name__)
+    app.register_blueprint(products.products_bp)
+    yield app.test_client()
+    database.close_connections()
+
+
+def test_failed_lookup_is_not_cached(client, monkeypatch):
+    def locked():
+        raise sqlite3.OperationalError("database is locked")
+
+    with monkeypatch.context() as m:
+        m.setattr(database, "get_connection", locked)
+        response = client.get("/api/products/categories")
+        assert orjson.loads(response.get_data()) == []
+        assert "Cache-Control" not in response.headers
+
+    response = client.get("/api/products/categories")
+    assert orjson.loads(response.get_data()) == [{"category_name": "Beauty"}]
+    assert response.headers["Cache-Control"].startswith("public")
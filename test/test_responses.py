@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("orjson")
+pd = pytest.importorskip("pandas")
+pa = pytest.importorskip("pyarrow")
+
+import orjson
+from flask import Flask
+
+from backend.utils.responses import ARROW_STREAM_MIMETYPE, df_response
+
+app = Flask(__name__)
+
+FRAME = pd.DataFrame({"sale_date": ["2023-01-01", "2023-01-02"], "total_quantity": [3, 5]})
+RECORDS = [
+    {"sale_date": "2023-01-01", "total_quantity": 3},
+    {"sale_date": "2023-01-02", "total_quantity": 5},
+]
+
+
+def respond(data, accept=None):
+    headers = {"Accept": accept} if accept else {}
+    with app.test_request_context(headers=headers):
+        return df_response(data)
+
+
+@pytest.mark.parametrize("accept", [None, "*/*", "application/json",
+                                    f"application/json, {ARROW_STREAM_MIMETYPE};q=0.5"])
+@pytest.mark.parametrize("data", [FRAME, pa.Table.from_pandas(FRAME)], ids=["frame", "table"])
+def test_json_unless_arrow_is_preferred(data, accept):
+    response = respond(data, accept)
+    assert response.mimetype == "application/json"
+    assert orjson.loads(response.get_data()) == RECORDS
+
+
+@pytest.mark.parametrize("accept", [ARROW_STREAM_MIMETYPE,
+                                    f"{ARROW_STREAM_MIMETYPE}, application/json;q=0.5"])
+@pytest.mark.parametrize("data", [FRAME, pa.Table.from_pandas(FRAME)], ids=["frame", "table"])
+def test_arrow_stream_when_preferred(data, accept):
+    response = respond(data, accept)
+    assert response.mimetype == ARROW_STREAM_MIMETYPE
+    table = pa.ipc.open_stream(response.get_data()).read_all()
+    assert table.to_pylist() == RECORDS
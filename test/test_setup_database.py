@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("pandas")
+
+import setup_database
+from backend.utils.database import SQL_PRODUCTS, SQL_PRODUCTS_BY_CATEGORY, SQL_CATEGORIES
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    setup_database.create_tables(conn)
+    conn.executemany(
+        "INSERT INTO products (sku_id, product_name, category) VALUES (?, ?, ?)",
+        [
+            ("S1", "Shampoo", "Haircare"),
+            ("S2", "Shampoo", "Haircare"),
+            ("S3", "Conditioner", "Haircare"),
+            ("S4", "Lip Balm", None),
+        ],
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_summary_tables_keep_products_without_category(conn):
+    setup_database.create_summary_tables(conn)
+
+    assert [row[0] for row in conn.execute(SQL_PRODUCTS)] == ["Conditioner", "Lip Balm", "Shampoo"]
+    assert [row[0] for row in conn.execute(SQL_CATEGORIES)] == ["Haircare"]
+    assert [row[0] for row in conn.execute(SQL_PRODUCTS_BY_CATEGORY, ("Haircare",))] == [
+        "Conditioner", "Shampoo"
+    ]
+
+
+def test_indexes_build_after_summary_tables(conn):
+    setup_database.create_summary_tables(conn)
+    setup_database.create_indexes(conn)
+
+    plan = " ".join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN " + SQL_PRODUCTS_BY_CATEGORY, ("Haircare",)))
+    assert "dim_product" in plan and "INDEX" in plan